@@ -1,17 +1,36 @@
 import os
 import datetime as dt
 from zoneinfo import ZoneInfo
-import requests
 import re
-import google.generativeai as genai
-from google.generativeai import types as genai_types
+import uuid
+import threading
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
-import pypdf
 import calendar_bridge
+import availability
+import recall_digest
+import storage
+import session_store
+from concurrent.futures import ThreadPoolExecutor
+from concurrency import CopyOnWriteMap, KeyedLocks
+from response_cache import ResponseCache, uncached
+import notifications
+import upload_manifest
+import upload_stream
+import compression
+import metrics
+import profiler
+import applog
+import llm_usage
+import jobs
+import quiz_sections
 
 load_dotenv()
 
+# Structured JSON logs, written to stderr by a background thread (LOG_LEVEL)
+applog.configure()
+log = applog.get_logger("app")
+
 # ========================
 # CONFIGURATION
 # ========================
@@ -20,14 +39,95 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
     raise RuntimeError("Please set the GOOGLE_API_KEY environment variable first.")
 
-genai.configure(api_key=GOOGLE_API_KEY)
 MODEL_NAME = "gemini-2.0-flash"
-model = genai.GenerativeModel(MODEL_NAME)
+
+# Gemini client, created on first use by get_model() so importing the app stays
+# fast (benchmarks and tests may assign a stand-in here)
+model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=GOOGLE_API_KEY)
+                model = genai.GenerativeModel(MODEL_NAME)
+    return model
+
+def generate_content(prompt_type, *args, user_id=None, route=None, **kwargs):
+    """
+    Every Gemini call goes through here, so it is timed per route and its
+    tokens are charged to the user (session user unless `user_id` is given).
+    Raises llm_usage.BudgetExceeded once the user's daily budget is used up.
+    """
+    if user_id is None and has_request_context():
+        user_id = session.get('user_id')
+    payload = kwargs.get("contents", args)
+    with metrics.span("gemini.generate_content", route):
+        with llm_usage.track(user_id, route or metrics.current_route(), prompt_type, payload) as call:
+            call["response"] = get_model().generate_content(*args, **kwargs)
+    return call["response"]
+
+async def generate_content_async(prompt_type, *args, user_id=None, route=None, executor=None, **kwargs):
+    """
+    generate_content for the ASGI mode: the wait on Gemini holds no thread,
+    and the usage accounting (SQLite) runs on `executor`, off the event loop.
+    """
+    payload = kwargs.get("contents", args)
+    with metrics.span("gemini.generate_content", route):
+        async with llm_usage.track_async(user_id, route or metrics.current_route(), prompt_type, payload, executor) as call:
+            call["response"] = await get_model().generate_content_async(*args, **kwargs)
+    return call["response"]
+
+class LLMStep:
+    """
+    Gemini calls a view needs before it can answer, plus the function that
+    finishes the view: `then(*responses)` gets one response per call (or the
+    exception that call raised) and returns the view's result - a response or
+    another LLMStep. Threaded views resolve steps in place (resolve_llm_steps);
+    asgi.py awaits the calls instead, so no thread waits on Gemini. With no
+    calls, a step just defers `then()` to wherever it is resolved (e.g. a
+    background job).
+    """
+
+    def __init__(self, calls, then, user_id=None, stage="gemini"):
+        self.calls = calls  # [(prompt_type, contents)]
+        self.then = then
+        self.user_id = user_id
+        self.stage = stage  # metrics stage the wait is timed under
+
+# Threads for the calls of one multi-call step (e.g. per-section quiz questions)
+llm_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+def resolve_llm_steps(result, route=None):
+    """Make a view's Gemini calls inline (threaded WSGI mode and background jobs)"""
+    route = route or metrics.current_route()
+    while isinstance(result, LLMStep):
+        step = result
+
+        def call(prompt_type, contents):
+            try:
+                return generate_content(prompt_type, contents, user_id=step.user_id, route=route)
+            except Exception as e:
+                return e
+
+        with metrics.span(step.stage, route):
+            if len(step.calls) > 1:
+                responses = list(llm_pool.map(lambda c: call(*c), step.calls))
+            else:
+                responses = [call(*c) for c in step.calls]
+        result = step.then(*responses)
+    return result
 
 # URL of your local Flask bridge (no Cloudflare)
 CALENDAR_BRIDGE_URL = "http://127.0.0.1:5001/create_event"
 
 UPLOAD_FOLDER = 'uploads'
+
+# Existing uploads are published to the RAG index at least this many at a time on startup
+RAG_LOAD_BATCH = 32
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'md'}
 
 if not os.path.exists(UPLOAD_FOLDER):
@@ -39,22 +139,36 @@ if not os.path.exists(UPLOAD_FOLDER):
 
 class SimpleRAG:
     def __init__(self):
-        self.documents = {}  # filename -> text content
+        # filename -> text content; copy-on-write, so searches never block on uploads
+        self.documents = CopyOnWriteMap()
 
     def add_document(self, filename, text):
-        self.documents[filename] = text
+        self.documents.set(filename, text)
+
+    def add_documents(self, texts):
+        """Add many documents with one copy of the index (startup load)"""
+        self.documents.update(texts)
+
+    def remove_document(self, filename):
+        self.documents.pop(filename)
+
+    def retrieve_context(self, query, sources=None):
+        # Work on one consistent snapshot even if an upload lands mid-search
+        documents = self.documents.snapshot()
 
-    def retrieve_context(self, query):
         # Check if query is a filename in our documents
-        if query in self.documents:
+        if query in documents:
             # Return the full document content for quiz generation
-            return self.documents[query]
+            return documents[query]
         
         # Otherwise, do keyword matching for RAG search
         relevant_chunks = []
         query_lower = query.lower()
         
-        for filename, text in self.documents.items():
+        for filename, text in documents.items():
+            # Optionally restrict the search to a set of filenames (e.g. one user's uploads)
+            if sources is not None and filename not in sources:
+                continue
             # Split into rough chunks (paragraphs)
             paragraphs = text.split('\n\n')
             for p in paragraphs:
@@ -71,19 +185,36 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def extract_text_from_file(filepath):
-    ext = filepath.rsplit('.', 1)[1].lower()
+    return extract_document(filepath)[0]
+
+def extract_document(filepath, filename=None, data=None, max_pages=None):
+    """
+    Returns (text, page count); page count is None for non-PDF files.
+    `filename` gives the file type when `filepath` is a temp file, `data` is
+    the body when it is already in memory, and PDFs over `max_pages` are
+    not extracted (text is "").
+    """
+    ext = (filename or filepath).rsplit('.', 1)[1].lower()
     text = ""
+    pages = None
     try:
         if ext == 'pdf':
+            import pypdf  # deferred: only needed once a PDF is read
             reader = pypdf.PdfReader(filepath)
+            pages = len(reader.pages)
+            if max_pages is not None and pages > max_pages:
+                return text, pages
             for page in reader.pages:
                 text += page.extract_text() + "\n"
+        elif data is not None:
+            # Same newline handling as reading the file in text mode
+            text = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
         else:
             with open(filepath, 'r', encoding='utf-8') as f:
                 text = f.read()
     except Exception as e:
-        print(f"Error reading file {filepath}: {e}")
-    return text
+        log.warning("extract.failed", path=filepath, error=e)
+    return text, pages
 
 # ========================
 # Timezone helpers
@@ -132,7 +263,8 @@ def create_calendar_event(summary: str, description: str, start_iso: str, end_is
     Call local calendar_bridge module to create an event.
     """
     try:
-        return calendar_bridge.add_study_block(summary, description, start_iso, end_iso, access_token)
+        with metrics.span("calendar.create_event"):
+            return calendar_bridge.add_study_block(summary, description, start_iso, end_iso, access_token)
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
@@ -142,18 +274,46 @@ def list_calendar_events(time_min: str, time_max: str, max_results: int = 10, ac
     Call local calendar_bridge module to list events.
     """
     try:
-        return calendar_bridge.list_events(time_min, time_max, max_results, access_token)
+        with metrics.span("calendar.list_events"):
+            return calendar_bridge.list_events(time_min, time_max, max_results, access_token)
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
 # ========================
 
+def latest_requested_start(events, now):
+    """Latest start time asked for in a create_events batch (at least `now`)"""
+    latest = now
+    for event in events:
+        try:
+            start = availability.parse_iso(event["start_iso"]) if event.get("start_iso") else None
+        except (ValueError, TypeError):
+            continue
+        if start is not None:
+            latest = max(latest, start.replace(tzinfo=now.tzinfo) if start.tzinfo is None else start)
+    return latest
+
+def get_busy_index(time_min: str, time_max: str, access_token: str = None):
+    """
+    One free/busy fetch, turned into a local interval index. None on failure.
+    """
+    try:
+        with metrics.span("calendar.freebusy"):
+            res = calendar_bridge.freebusy(time_min, time_max, access_token)
+    except Exception as e:
+        log.warning("calendar.freebusy_failed", error=e)
+        return None
+    if not res.get("ok"):
+        return None
+    return availability.BusyIndex.from_freebusy(res["busy"], until=availability.parse_iso(time_max))
+
 def update_calendar_event(event_id: str, summary: str = None, description: str = None, start_iso: str = None, end_iso: str = None, access_token: str = None) -> dict:
     """
     Call local calendar_bridge module to update an event.
     """
     try:
-        return calendar_bridge.update_event(event_id, summary, description, start_iso, end_iso, access_token)
+        with metrics.span("calendar.update_event"):
+            return calendar_bridge.update_event(event_id, summary, description, start_iso, end_iso, access_token)
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
@@ -162,7 +322,8 @@ def delete_calendar_event(event_id: str, access_token: str = None) -> dict:
     Call local calendar_bridge module to delete an event.
     """
     try:
-        return calendar_bridge.delete_event(event_id, access_token)
+        with metrics.span("calendar.delete_event"):
+            return calendar_bridge.delete_event(event_id, access_token)
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
@@ -291,12 +452,15 @@ VERY IMPORTANT:
        If the user asks you to "schedule this plan" or "save these events", and you have just generated a list of tasks/events with times, you can create them all at once.
        Output a JSON block with action "create_events" (plural) and a list of events.
        
-       IMPORTANT: If the plan has vague times like "Morning", "Afternoon", "Evening", YOU MUST INFER CONCRETE TIMES based on the user's preferences or defaults:
+       IMPORTANT: If the plan has vague times like "Morning", "Afternoon", "Evening", YOU MUST INFER CONCRETE TIMES.
+       If [SYSTEM CONTEXT] has 'free_slots', pick times inside those slots. Otherwise use these defaults:
        - Morning: 10:00 AM
        - Afternoon: 2:00 PM
        - Evening: 6:00 PM
        
-       Do NOT ask the user for times again if they said "schedule it". Just pick reasonable defaults and generate the JSON.
+       Do NOT ask the user for times again if they said "schedule it". Just pick reasonable times and generate the JSON.
+       The Python wrapper checks every event against the user's calendar and moves it to the nearest free slot
+       if it collides with an existing event, so always include a realistic duration (end_iso).
        
        Format:
        ```json
@@ -341,9 +505,9 @@ VERY IMPORTANT:
 """
 
 
-def chat_with_agent(user_message: str, history: list[dict], context: dict | None = None) -> str:
+def chat_contents(user_message: str, history: list[dict], context: dict | None = None) -> list:
     """
-    Send a message to Gemini with history and extra context.
+    Gemini request for a chat message, with history and extra context.
     """
     parts = []
 
@@ -376,11 +540,18 @@ def chat_with_agent(user_message: str, history: list[dict], context: dict | None
         "role": "user",
         "parts": parts
     }
+    return [content]
 
+
+def chat_reply(resp) -> str:
+    """
+    Text of Gemini's answer to chat_contents(), or of the error the call failed with.
+    """
+    if isinstance(resp, llm_usage.BudgetExceeded):
+        raise resp
     try:
-        resp = model.generate_content(
-            contents=[content],
-        )
+        if isinstance(resp, Exception):
+            raise resp
 
         if resp.candidates and resp.candidates[0].content and resp.candidates[0].content.parts:
             text = resp.candidates[0].content.parts[0].text
@@ -396,9 +567,9 @@ def chat_with_agent(user_message: str, history: list[dict], context: dict | None
 # FLASK WEB SERVER
 # ========================
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-import uuid
+from flask import Flask, Request, Response, g, has_request_context, render_template, request, jsonify, session, redirect, url_for
 import json
+import time
 
 # Explicitly set template and static folders for PythonAnywhere
 template_dir = os.path.abspath('/home/manish2111/mysite/templates')
@@ -407,55 +578,312 @@ app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
 
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "STUDY_COPILOT_SECURE_SECRET_KEY_123") # Load from env or fallback
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Requests announcing a larger body are refused before anything is read
+app.config['MAX_CONTENT_LENGTH'] = upload_stream.MAX_UPLOAD_BYTES + upload_stream.MULTIPART_OVERHEAD
+
+class UploadRequest(Request):
+    """
+    Streams uploaded files into upload_stream.IncomingFile (one hashed,
+    size-limited pass to disk) instead of werkzeug's spooled temp files.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        keep_bytes = not (filename or "").lower().endswith(".pdf")
+        incoming = upload_stream.IncomingFile(UPLOAD_FOLDER, keep_bytes=keep_bytes)
+        # Remembered here too: a body that fails mid-parse never reaches request.files
+        self.__dict__.setdefault("incoming_files", []).append(incoming)
+        return incoming
+
+app.request_class = UploadRequest
+
+@app.teardown_request
+def discard_incoming_files(exc):
+    """Remove upload temp files no view committed (rejected uploads, other routes, disconnects)"""
+    for incoming in request.__dict__.get("incoming_files", ()):
+        incoming.discard()  # no-op once committed
+
+# Fingerprinted, precompressed static files (see /assets and asset_url)
+static_assets = compression.StaticAssets(app.static_folder)
+
+@app.context_processor
+def inject_asset_url():
+    return {"asset_url": lambda name: static_assets.url(name, reload=app.debug)}
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - started, metrics.current_route(), request.method, str(response.status_code)
+        )
+    return response
+
+# Opt-in wall-clock profiling of individual requests (see /admin/profiles)
+request_profiler = profiler.Profiler()
+
+@app.before_request
+def start_profile():
+    if request_profiler.wanted(request.path, request.headers.get("X-Profile")):
+        g.profile = request_profiler.start(metrics.current_route(), request.method)
 
-# Global sessions storage
-sessions = {}
+@app.teardown_request
+def stop_profile(exc):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        request_profiler.stop(profile)
+
+@app.after_request
+def compress_json(response):
+    return compression.compress_json_response(response, request.accept_encodings)
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    limit_mb = upload_stream.MAX_UPLOAD_BYTES // (1024 * 1024)
+    return jsonify({"error": f"File is too large (limit {limit_mb} MB)."}), 413
+
+@app.errorhandler(llm_usage.BudgetExceeded)
+def llm_budget_exceeded(e):
+    return jsonify({"error": str(e), "used_tokens": e.used, "budget_tokens": e.budget}), 429
+
+# Chat sessions storage (SQLite by default, shared across worker processes)
+sessions = session_store.create_session_store()
+
+# Serializes history updates within a chat session (per process)
+session_locks = KeyedLocks()
+
+# Per-user snapshots of polled GET endpoints, invalidated by the write paths
+api_cache = ResponseCache()
+
+# Calendar data can change outside the app, so calendar-backed snapshots expire
+CALENDAR_CACHE_TTL = 120
+
+# Pushes typed change notifications to the user's open tabs (/stream)
+change_bus = notifications.ChangeBus()
+
+def record_change(user_id, change_type, **data):
+    """Invalidate the user's cached responses and notify their open tabs"""
+    api_cache.invalidate(user_id, notifications.CHANGE_KINDS[change_type])
+    change_bus.publish(user_id, change_type, data)
 
 # Load existing files into RAG system on startup
 def load_existing_files():
     """Load all existing files from uploads folder (recursive) into RAG system"""
+    pending = {}
     if os.path.exists(UPLOAD_FOLDER):
         for root, dirs, files in os.walk(UPLOAD_FOLDER):
             for filename in files:
                 if allowed_file(filename):
                     filepath = os.path.join(root, filename)
-                    print(f"Loading {filename} into RAG system...")
                     text = extract_text_from_file(filepath)
                     if text:
                         # Use filename as key (assuming unique names per user, or global uniqueness not strictly enforced for RAG yet)
-                        rag_system.add_document(filename, text)
-                        print(f"✓ Loaded {filename} ({len(text)} chars)")
+                        pending[filename] = text
+                        log.info("rag.loaded", filename=filename, chars=len(text))
                     else:
-                        print(f"✗ Failed to extract text from {filename}")
+                        log.warning("rag.extract_empty", filename=filename)
+                    # Publish in batches that grow with the index, so every copy of it
+                    # is paid for by as many new documents (linear overall) while
+                    # retrieval still sees files as they load
+                    if len(pending) >= max(RAG_LOAD_BATCH, len(rag_system.documents.snapshot())):
+                        rag_system.add_documents(pending)
+                        pending = {}
+    if pending:
+        rag_system.add_documents(pending)
+
+# Set once existing uploads are indexed (see /ready)
+rag_ready = threading.Event()
+
+def warm_up():
+    try:
+        static_assets.load()
+        load_existing_files()
+    finally:
+        rag_ready.set()
 
-# Load files on startup
-load_existing_files()
+# Fingerprint static files and index existing uploads in the background so the
+# server can take requests immediately; retrieval covers whatever is loaded so far
+threading.Thread(target=warm_up, name="warmup", daemon=True).start()
 
-@app.route("/upload", methods=["POST"])
-def upload_endpoint():
-    """Handle file uploads"""
-    if 'file' not in request.files:
-        return jsonify({"success": False, "error": "No file part"}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"success": False, "error": "No selected file"}), 400
-    
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # Extract text and add to RAG system
-        text = extract_text_from_file(filepath)
-        if text:
-            rag_system.add_document(filename, text)
-            return jsonify({"success": True, "filename": filename})
-        else:
-            return jsonify({"success": False, "error": "Failed to extract text"}), 500
-    
-    return jsonify({"success": False, "error": "Invalid file type"}), 400
+def user_uploads(user_id):
+    """Manifest entries for one user's uploads (rebuilt from disk if missing)"""
+    user_folder = os.path.join(UPLOAD_FOLDER, user_id)
+    if upload_manifest.ensure(user_id, user_folder, allowed_file, rag_system.documents.snapshot()):
+        # Listed right away; hashes, page counts and final status follow once the warmup is done
+        threading.Thread(target=complete_manifest, args=(user_id, user_folder), name="manifest", daemon=True).start()
+    return storage.uploads_for_user(user_id)
 
+def complete_manifest(user_id, user_folder):
+    rag_ready.wait()
+    if upload_manifest.fill_in(user_id, user_folder, rag_system.documents.snapshot()):
+        record_change(user_id, "upload_indexed")
+
+def list_user_files(user_id):
+    """Filenames uploaded by one user"""
+    return [f["name"] for f in user_uploads(user_id)]
+
+def build_recall_digest(user_id, access_token):
+    """
+    Snapshot yesterday's study events and pre-generate the Daily Recall quiz.
+    Returns None if the calendar or the model call failed, so it is retried later.
+    """
+    digest, quiz_prompt = prepare_recall_digest(user_id, access_token)
+    if digest is None or quiz_prompt is None:
+        return digest
+    response = generate_content("recall_digest", quiz_prompt, user_id=user_id)
+    return complete_recall_digest(digest, response)
+
+def prepare_recall_digest(user_id, access_token):
+    """
+    The digest skeleton from yesterday's events and the prompt for its questions:
+    (None, None) if the calendar failed, (digest, None) if there is nothing to quiz.
+    """
+    tz = get_ist_tz()
+    now = dt.datetime.now(tz)
+    yesterday = now - dt.timedelta(days=1)
+    start = yesterday.replace(hour=0, minute=0, second=0).isoformat()
+    end = yesterday.replace(hour=23, minute=59, second=59).isoformat()
+
+    events_res = list_calendar_events(start, end, max_results=20, access_token=access_token)
+    if not events_res.get("ok"):
+        return None, None
+
+    events = events_res.get("events", [])
+    topics = [e.get("summary", "") for e in events]
+    digest = {
+        "date": now.strftime("%Y-%m-%d"),
+        "generated_at": now.isoformat(),
+        "topics": topics,
+        "events": [{"id": e.get("id"), "summary": e.get("summary"), "start": e.get("start")} for e in events],
+        "questions": []
+    }
+    if not topics:
+        return digest, None
+
+    topics_str = ", ".join(topics)
+    notes = rag_system.retrieve_context(topics_str, sources=set(list_user_files(user_id)))
+    notes_section = f"\n\nRelevant notes from the student's uploads:\n{notes}" if notes else ""
+
+    quiz_prompt = f"""You studied these topics yesterday: {topics_str}{notes_section}
+
+Generate 5 quick recall questions to test retention. Use this EXACT JSON format:
+```json
+{{
+    "questions": [
+        {{
+            "question": "Question text here?",
+            "options": ["Option A", "Option B", "Option C", "Option D"],
+            "correct": 0
+        }}
+    ]
+}}
+```"""
+    return digest, quiz_prompt
+
+def complete_recall_digest(digest, response):
+    """The digest with the questions from Gemini's answer, or None if it had none"""
+    quiz_data = parse_json_from_response(response.text)
+    if not quiz_data:
+        return None
+
+    digest["questions"] = quiz_data.get("questions", [])
+    return digest
+
+# Keep a Daily Recall digest ready for every active user
+recall_scheduler = recall_digest.DigestScheduler(
+    build_recall_digest,
+    lambda: get_current_datetime()["date"]
+)
+recall_scheduler.start()
+
+@app.route("/assets/<path:fingerprint>")
+def fingerprinted_asset(fingerprint):
+    """Static file by content-hash URL: cached forever, precompressed when possible"""
+    asset = static_assets.get(fingerprint, reload=app.debug)
+    if asset is None:
+        return jsonify({"error": "Not found"}), 404
+
+    encoding = compression.pick_encoding(request.accept_encodings, asset["variants"])
+    response = Response(asset["variants"][encoding] if encoding else asset["body"], mimetype=asset["mimetype"])
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if asset["variants"]:
+        response.vary.add("Accept-Encoding")
+    response.set_etag(asset["etag"], weak=bool(encoding))
+    response.headers["Cache-Control"] = compression.IMMUTABLE_CACHE_CONTROL
+    return response
+
+# Optional bearer token for /metrics (unset: open, e.g. behind a private network)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target: latency histograms per route and per stage (this process)"""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+# Bearer token for the /admin endpoints (unset: they are disabled).
+# PROFILE_ADMIN_TOKEN is still read for older deployments.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or os.getenv("PROFILE_ADMIN_TOKEN")
+
+def is_admin():
+    return bool(ADMIN_TOKEN) and request.headers.get("Authorization") == f"Bearer {ADMIN_TOKEN}"
+
+@app.route("/admin/profiles")
+def list_profiles():
+    """The slowest profiled requests kept by this process, slowest first"""
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"profiles": [p.summary() for p in request_profiler.profiles()]})
+
+@app.route("/admin/profiles/<int:profile_id>")
+def get_profile(profile_id):
+    """One profile as folded stacks (flamegraph.pl, speedscope, inferno)"""
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return Response(profile.folded(), mimetype="text/plain")
+
+@app.route("/admin/llm_usage")
+def llm_usage_summary():
+    """
+    Gemini calls, tokens, latency and cache hits over the last `days` days
+    (UTC, all processes), grouped by user_id, route, prompt_type or day.
+    """
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+    group_by = request.args.get("group_by", "prompt_type")
+    if group_by not in storage.LLM_USAGE_GROUPS:
+        return jsonify({"error": f"group_by must be one of {', '.join(storage.LLM_USAGE_GROUPS)}"}), 400
+    days = max(1, request.args.get("days", 7, type=int))
+    since = (dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    rows = storage.llm_usage_summary(since, group_by, request.args.get("user_id"))
+    return jsonify({"since": since, "group_by": group_by, "usage": rows})
+
+@app.route("/llm_usage")
+def my_llm_usage():
+    """Today's token use for the signed-in user and what is left of the daily budget"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify({
+        "day": llm_usage.today(),
+        "used_tokens": storage.llm_tokens_for_day(user_id, llm_usage.today()),
+        "budget_tokens": llm_usage.DAILY_TOKEN_BUDGET or None,
+        "remaining_tokens": llm_usage.remaining_budget(user_id),
+    })
+
+@app.route("/ready")
+def ready():
+    """Readiness probe: 503 until existing uploads are indexed"""
+    body = {"ready": rag_ready.is_set(), "documents": len(rag_system.documents)}
+    return jsonify(body), 200 if body["ready"] else 503
 
 @app.route("/")
 def index():
@@ -478,7 +906,10 @@ def auth_login():
     session['user_email'] = data.get('email')
     session['user_name'] = data.get('name')
     session['access_token'] = data.get('access_token') # Store Google OAuth Access Token
-    print(f"[DEBUG] /auth/login: Stored access_token ending in ...{session['access_token'][-6:] if session.get('access_token') else 'None'}")
+    recall_scheduler.touch(session['user_id'], session['access_token'])
+    # Calendar responses cached under the previous token may be errors (expired token)
+    api_cache.invalidate(session['user_id'], "events")
+    log.debug("auth.login", user_id=session['user_id'], has_access_token=bool(session['access_token']))
     return jsonify({"success": True})
 
 @app.route("/logout")
@@ -492,12 +923,7 @@ def get_sessions():
     if not user_id:
         return jsonify([])
         
-    session_list = [
-        {"id": sid, "title": s["title"]} 
-        for sid, s in sessions.items()
-        if s.get("user_id") == user_id
-    ]
-    return jsonify(session_list[::-1])
+    return api_cache.respond(user_id, "sessions", lambda: jsonify(sessions.list_for_user(user_id)))
 
 @app.route("/new_chat", methods=["POST"])
 def new_chat():
@@ -505,37 +931,57 @@ def new_chat():
     if not user_id:
         return jsonify({"error": "Unauthorized"}), 401
         
-    session_id = str(uuid.uuid4())
-    sessions[session_id] = {
-        "title": "New Chat",
-        "history": [],
-        "user_id": user_id
-    }
+    session_id = sessions.create(user_id)
+    record_change(user_id, "sessions_changed", session_id=session_id)
     return jsonify({"id": session_id, "title": "New Chat"})
 
 @app.route("/sessions/<session_id>", methods=["DELETE"])
 def delete_session(session_id):
     user_id = session.get('user_id')
-    if session_id in sessions:
+    chat_session = sessions.get(session_id)
+    if chat_session:
         # Check ownership
-        if sessions[session_id].get("user_id") == user_id:
-            del sessions[session_id]
+        if chat_session.get("user_id") == user_id:
+            sessions.delete(session_id)
+            record_change(user_id, "sessions_changed", session_id=session_id)
             return jsonify({"success": True})
         else:
             return jsonify({"error": "Unauthorized"}), 403
     return jsonify({"error": "Session not found"}), 404
 
+HISTORY_PAGE_MAX = 200
+
 @app.route("/history/<session_id>", methods=["GET"])
 def get_history(session_id):
+    """
+    Chat turns of a session.
+    With ?limit=N returns the latest N turns; add ?before=<turn id> for older
+    pages or ?after=<turn id> for turns added since. Without paging params the
+    whole history is returned as a plain list (legacy clients).
+    """
     user_id = session.get('user_id')
-    if session_id not in sessions:
+    chat_session = sessions.get_info(session_id)
+    if not chat_session:
         return jsonify({"error": "Session not found"}), 404
         
     # Check ownership
-    if sessions[session_id].get("user_id") != user_id:
+    if chat_session.get("user_id") != user_id:
         return jsonify({"error": "Unauthorized"}), 403
-        
-    return jsonify(sessions[session_id]["history"])
+
+    limit = request.args.get("limit", type=int)
+    before_id = request.args.get("before", type=int)
+    after_id = request.args.get("after", type=int)
+    if limit is None and before_id is None and after_id is None:
+        return jsonify(sessions.get(session_id)["history"])
+
+    limit = max(1, min(limit or 50, HISTORY_PAGE_MAX))
+    turns, has_more = sessions.get_turns(session_id, limit, before_id=before_id, after_id=after_id)
+    return jsonify({
+        "turns": turns,
+        "has_more": has_more,
+        "oldest_id": turns[0]["id"] if turns else before_id,
+        "latest_id": turns[-1]["id"] if turns else after_id
+    })
 
 @app.route("/upload", methods=["POST"])
 def upload_file():
@@ -548,28 +994,54 @@ def upload_file():
     file = request.files['file']
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
-    
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        
-        # Create user-specific folder
-        user_folder = os.path.join(app.config['UPLOAD_FOLDER'], user_id)
-        if not os.path.exists(user_folder):
-            os.makedirs(user_folder)
+
+    # Already on disk, hashed and size-checked by UploadRequest while parsing
+    incoming = file.stream
+    try:
+        if file and allowed_file(file.filename):
+            filename = secure_filename(file.filename)
             
-        filepath = os.path.join(user_folder, filename)
-        file.save(filepath)
-        
-        # Extract and index text immediately
-        text = extract_text_from_file(filepath)
-        rag_system.add_document(filename, text)
+            # Create user-specific folder
+            user_folder = os.path.join(app.config['UPLOAD_FOLDER'], user_id)
+            if not os.path.exists(user_folder):
+                os.makedirs(user_folder)
+                
+            filepath = os.path.join(user_folder, filename)
+
+            # Extract before moving the file into place, so a rejected upload
+            # never replaces an existing file; text files come from memory
+            text, pages = extract_document(
+                incoming.path, filename=filename, data=incoming.data(),
+                max_pages=upload_stream.MAX_UPLOAD_PAGES
+            )
+            if pages and pages > upload_stream.MAX_UPLOAD_PAGES:
+                return jsonify({"error": f"PDF has {pages} pages (limit {upload_stream.MAX_UPLOAD_PAGES})."}), 413
+            incoming.commit(filepath)
+            
+            # Index text immediately
+            rag_system.add_document(filename, text)
+            upload_manifest.record_upload(
+                user_id, filepath,
+                status=upload_manifest.INDEXED if text else upload_manifest.FAILED,
+                pages=pages, sha256=incoming.sha256, size=incoming.size
+            )
+            record_change(user_id, "upload_indexed", filename=filename)
+            
+            return jsonify({"success": True, "filename": filename, "message": "File uploaded and indexed."})
         
-        return jsonify({"success": True, "filename": filename, "message": "File uploaded and indexed."})
-    
-    return jsonify({"error": "File type not allowed"}), 400
+        return jsonify({"error": "File type not allowed"}), 400
+    finally:
+        incoming.discard()  # no-op once committed
 
 @app.route("/chat", methods=["POST"])
 def chat_endpoint():
+    return resolve_llm_steps(start_chat_turn())
+
+def start_chat_turn():
+    """
+    Everything /chat does before asking Gemini: session, intent, calendar,
+    free slots, notes. The answer is handled by finish_chat_turn.
+    """
     data = request.json
     user_msg = data.get("message", "")
     session_id = data.get("session_id")
@@ -577,65 +1049,81 @@ def chat_endpoint():
     if not user_msg:
         return jsonify({"error": "No message provided"}), 400
 
-    if not session_id or session_id not in sessions:
+    session_data = sessions.get(session_id) if session_id else None
+    if not session_data:
         user_id = session.get('user_id')
         if not user_id:
              return jsonify({"error": "Unauthorized"}), 401
              
-        session_id = str(uuid.uuid4())
-        sessions[session_id] = {
-            "title": "New Chat",
-            "history": [],
-            "user_id": user_id
-        }
+        session_id = sessions.create(user_id)
+        session_data = sessions.get(session_id)
     
-    session_data = sessions[session_id]
     chat_history = session_data["history"]
 
-    if len(chat_history) == 0:
-        session_data["title"] = user_msg[:30] + "..." if len(user_msg) > 30 else user_msg
-
     # 1. Context & Intent Detection
-    today_info = get_current_datetime()
-    user_name = session.get('user_name', 'User')
-    context = {
-        "today_info": today_info,
-        "user_name": user_name
-    }
-    events_updated = False
-    
-    lower_msg = user_msg.lower()
-    # Expanded keywords to include deletion/cancellation
-    is_calendar_action = any(k in lower_msg for k in ["reschedule", "move", "change", "missed", "delete", "remove", "cancel"])
+    with metrics.span("intent"):
+        today_info = get_current_datetime()
+        user_name = session.get('user_name', 'User')
+        context = {
+            "today_info": today_info,
+            "user_name": user_name
+        }
+        events_updated = False
+        event_change = None  # notification type pushed to the browser
+        
+        lower_msg = user_msg.lower()
+        # Expanded keywords to include deletion/cancellation
+        is_calendar_action = any(k in lower_msg for k in ["reschedule", "move", "change", "missed", "delete", "remove", "cancel"])
     
     # 2. Handle calendar requests - fetch upcoming events to help agent
     # CRITICAL: Always get the fresh token from the session for the CURRENT user
     access_token = session.get('access_token')
-    print(f"[DEBUG] /chat: Using access_token ending in ...{access_token[-6:] if access_token else 'None'}")
+    log.debug("chat.request", session_id=session_id, has_access_token=bool(access_token), calendar_action=is_calendar_action)
     
     if is_calendar_action:
-        tz = get_ist_tz()
-        now = dt.datetime.now(tz)
-        # Look back 2 days for "missed" events, look forward 30 days for upcoming
-        start_search = (now - dt.timedelta(days=2)).isoformat()
-        end_search = (now + dt.timedelta(days=30)).isoformat()
-        list_res = list_calendar_events(start_search, end_search, max_results=50, access_token=access_token)
+        with metrics.span("calendar_fetch"):
+            tz = get_ist_tz()
+            now = dt.datetime.now(tz)
+            # Look back 2 days for "missed" events, look forward 30 days for upcoming
+            start_search = (now - dt.timedelta(days=2)).isoformat()
+            end_search = (now + dt.timedelta(days=30)).isoformat()
+            list_res = list_calendar_events(start_search, end_search, max_results=50, access_token=access_token)
         
-        if list_res.get("ok") and list_res.get("events"):
-            context["upcoming_events"] = list_res["events"]
-            # Also specifically flag past events if user said "missed"
-            if "missed" in lower_msg:
-                past_events = [e for e in list_res["events"] if e.get("start", {}).get("dateTime") < now.isoformat()]
-                context["past_events"] = past_events
+            if list_res.get("ok") and list_res.get("events"):
+                context["upcoming_events"] = list_res["events"]
+                # Also specifically flag past events if user said "missed"
+                if "missed" in lower_msg:
+                    past_events = [e for e in list_res["events"] if e.get("start", {}).get("dateTime") < now.isoformat()]
+                    context["past_events"] = past_events
     
+    # 2b. Planning requests - one free/busy fetch, reused for placing events below
+    busy_index = None
+    # Whole words only: "explain" or "planet" is no reason to fetch the calendar
+    is_planning = not is_calendar_action and re.search(r"\b(schedul\w*|plan(s|ned|ning)?)\b", lower_msg) is not None
+    if is_planning and access_token:
+        with metrics.span("free_slots"):
+            now = dt.datetime.now(get_ist_tz())
+            busy_index = get_busy_index(
+                now.isoformat(),
+                (now + dt.timedelta(days=availability.SEARCH_DAYS)).isoformat(),
+                access_token=access_token
+            )
+            if busy_index is not None:
+                openings = availability.free_slots(busy_index, now, now + dt.timedelta(days=7))
+                context["free_slots"] = [
+                    {"start_iso": s.isoformat(), "end_iso": e.isoformat()} for s, e in openings[:20]
+                ]
+
     # 3. RAG Context Retrieval
-    rag_context = rag_system.retrieve_context(user_msg)
+    with metrics.span("rag_retrieval"):
+        rag_context = rag_system.retrieve_context(user_msg)
     if rag_context:
         context["rag_context"] = rag_context
 
     # 4. Auto-create logic (Tomorrow at X)
     if not is_calendar_action and "tomorrow" in lower_msg and ("am" in lower_msg or "pm" in lower_msg):
-        auto_info = auto_create_tomorrow_event(user_msg, today_info, access_token=access_token)
+        with metrics.span("auto_event"):
+            auto_info = auto_create_tomorrow_event(user_msg, today_info, access_token=access_token)
         if auto_info:
             context["auto_event_info"] = {
                 "summary": auto_info["summary"],
@@ -644,100 +1132,171 @@ def chat_endpoint():
                 "calendar_result": auto_info["calendar_result"],
             }
             events_updated = True
+            event_change = "event_created"
 
     # 5. Call Gemini Agent
-    agent_response = chat_with_agent(user_msg, chat_history, context)
-    
+    turn = {
+        "user_msg": user_msg,
+        "session_id": session_id,
+        "session_data": session_data,
+        "access_token": access_token,
+        "busy_index": busy_index,
+        "events_updated": events_updated,
+        "event_change": event_change,
+    }
+    return LLMStep(
+        [("chat", chat_contents(user_msg, chat_history, context))],
+        lambda resp: finish_chat_turn(turn, resp),
+        user_id=session.get('user_id')
+    )
+
+def finish_chat_turn(turn, resp):
+    """Act on the agent's answer (calendar actions), save the exchange and reply"""
+    agent_response = chat_reply(resp)
+    user_msg, session_id, session_data = turn["user_msg"], turn["session_id"], turn["session_data"]
+    access_token, busy_index = turn["access_token"], turn["busy_index"]
+    events_updated, event_change = turn["events_updated"], turn["event_change"]
+
     # 6. Parse JSON from agent response
-    json_match = re.search(r'```json(.*?)```', agent_response, re.DOTALL)
-    if json_match:
-        try:
-            json_data = json.loads(json_match.group(1))
-            action = json_data.get("action")
+    json_data = None
+    with metrics.span("parse_action"):
+        json_match = re.search(r'```json(.*?)```', agent_response, re.DOTALL)
+        if json_match:
+            try:
+                json_data = json.loads(json_match.group(1))
+            except json.JSONDecodeError as e:
+                log.warning("chat.action_json_invalid", error=e)
+
+    # 7. Execute the action
+    if json_data is not None:
+        with metrics.span("execute_action"):
+            try:
+                action = json_data.get("action")
             
-            if action == "create_events":
-                events = json_data.get("events", [])
-                created_count = 0
-                failed_count = 0
+                if action == "create_events":
+                    events = json_data.get("events", [])
+                    created_count = 0
+                    failed_count = 0
+                    moved_count = 0
+
+                    # Fit the batch around existing events before creating anything
+                    now = dt.datetime.now(get_ist_tz())
+                    latest = latest_requested_start(events, now)
+                    # Refetch if the planning fetch ends before (or within a day of) a requested start;
+                    # events pushed past the end of the busy data come back unscheduled
+                    if access_token and (busy_index is None or (
+                            busy_index.until is not None and busy_index.until < latest + dt.timedelta(days=1))):
+                        busy_index = get_busy_index(
+                            now.isoformat(),
+                            (latest + dt.timedelta(days=availability.SEARCH_DAYS)).isoformat(),
+                            access_token=access_token
+                        )
+                    if busy_index is not None:
+                        try:
+                            events = availability.schedule_events(events, busy_index, now)
+                        except (ValueError, TypeError) as e:
+                            log.warning("chat.schedule_failed", error=e)
                 
-                for event in events:
-                    result = create_calendar_event(
-                        summary=event.get("summary", "Event"),
-                        description=event.get("description", ""),
-                        start_iso=event.get("start_iso"),
-                        end_iso=event.get("end_iso"),
-                        access_token=access_token
-                    )
+                    for event in events:
+                        if event.get("unscheduled"):
+                            failed_count += 1
+                            continue
+                        if event.get("rescheduled"):
+                            moved_count += 1
+
+                        result = create_calendar_event(
+                            summary=event.get("summary", "Event"),
+                            description=event.get("description", ""),
+                            start_iso=event.get("start_iso"),
+                            end_iso=event.get("end_iso"),
+                            access_token=access_token
+                        )
                     
-                    if result.get("ok"):
-                        created_count += 1
-                    else:
-                        failed_count += 1
-                        print(f"[ERROR] Failed to create event '{event.get('summary')}': {result.get('error')}")
+                        if result.get("ok"):
+                            created_count += 1
+                        else:
+                            failed_count += 1
+                            log.warning("chat.create_event_failed", error=result.get('error'))
                 
-                if created_count > 0:
-                    events_updated = True
-                    confirmation = f"\n\n✅ Successfully created {created_count} event(s) in your Google Calendar!"
-                    if failed_count > 0:
-                        confirmation += f" ({failed_count} failed)"
-                    agent_response += confirmation
+                    if created_count > 0:
+                        events_updated = True
+                        event_change = "event_created"
+                        confirmation = f"\n\n✅ Successfully created {created_count} event(s) in your Google Calendar!"
+                        if failed_count > 0:
+                            confirmation += f" ({failed_count} failed)"
+                        if moved_count > 0:
+                            confirmation += f"\n🔀 {moved_count} event(s) were moved to the nearest free slot to avoid clashes."
+                        agent_response += confirmation
             
-            elif action == "update_event":
-                event_id = json_data.get("eventId")
-                start_iso = json_data.get("start_iso")
-                end_iso = json_data.get("end_iso")
+                elif action == "update_event":
+                    event_id = json_data.get("eventId")
+                    start_iso = json_data.get("start_iso")
+                    end_iso = json_data.get("end_iso")
                 
-                if event_id and start_iso and end_iso:
-                    result = update_calendar_event(
-                        event_id=event_id,
-                        start_iso=start_iso,
-                        end_iso=end_iso,
-                        access_token=access_token
-                    )
+                    if event_id and start_iso and end_iso:
+                        result = update_calendar_event(
+                            event_id=event_id,
+                            start_iso=start_iso,
+                            end_iso=end_iso,
+                            access_token=access_token
+                        )
                     
-                    if result.get("ok"):
-                        events_updated = True
-                        agent_response += "\n\n✅ Event updated successfully!"
-                    else:
-                        agent_response += f"\n\n❌ Failed to update event: {result.get('error')}"
+                        if result.get("ok"):
+                            events_updated = True
+                            event_change = "event_updated"
+                            agent_response += "\n\n✅ Event updated successfully!"
+                        else:
+                            agent_response += f"\n\n❌ Failed to update event: {result.get('error')}"
             
-            elif action == "delete_event":
-                event_id = json_data.get("eventId")
-                if event_id:
-                    result = delete_calendar_event(event_id, access_token=access_token)
-                    if result.get("ok"):
-                        events_updated = True
-                        agent_response += "\n\n✅ Event deleted successfully!"
-                    else:
-                        agent_response += f"\n\n❌ Failed to delete event: {result.get('error')}"
-
-            elif action == "delete_events":
-                event_ids = json_data.get("eventIds", [])
-                deleted_count = 0
-                failed_count = 0
+                elif action == "delete_event":
+                    event_id = json_data.get("eventId")
+                    if event_id:
+                        result = delete_calendar_event(event_id, access_token=access_token)
+                        if result.get("ok"):
+                            events_updated = True
+                            event_change = "event_deleted"
+                            agent_response += "\n\n✅ Event deleted successfully!"
+                        else:
+                            agent_response += f"\n\n❌ Failed to delete event: {result.get('error')}"
+
+                elif action == "delete_events":
+                    event_ids = json_data.get("eventIds", [])
+                    deleted_count = 0
+                    failed_count = 0
                 
-                for event_id in event_ids:
-                    result = delete_calendar_event(event_id, access_token=access_token)
-                    if result.get("ok"):
-                        deleted_count += 1
-                    else:
-                        failed_count += 1
+                    for event_id in event_ids:
+                        result = delete_calendar_event(event_id, access_token=access_token)
+                        if result.get("ok"):
+                            deleted_count += 1
+                        else:
+                            failed_count += 1
                 
-                if deleted_count > 0:
-                    events_updated = True
-                    msg = f"\n\n✅ Successfully deleted {deleted_count} event(s)."
-                    if failed_count > 0:
-                        msg += f" ({failed_count} failed)"
-                    agent_response += msg
+                    if deleted_count > 0:
+                        events_updated = True
+                        event_change = "event_deleted"
+                        msg = f"\n\n✅ Successfully deleted {deleted_count} event(s)."
+                        if failed_count > 0:
+                            msg += f" ({failed_count} failed)"
+                        agent_response += msg
         
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] Failed to parse JSON from agent response: {e}")
-        except Exception as e:
-            print(f"[ERROR] Error processing agent JSON: {e}")
+            except Exception as e:
+                log.error("chat.action_failed", exc_info=True, action=json_data.get("action") if isinstance(json_data, dict) else None)
     
-    chat_history.append({"role": "user", "content": user_msg})
-    chat_history.append({"role": "model", "content": agent_response})
+    # One writer per session: the title check and the append can't interleave
+    # with another request on the same chat
+    with session_locks.hold(session_id):
+        if not sessions.get_turns(session_id, 1)[0]:
+            session_data["title"] = user_msg[:30] + "..." if len(user_msg) > 30 else user_msg
+            sessions.set_title(session_id, session_data["title"])
+            record_change(session_data["user_id"], "sessions_changed", session_id=session_id)
+        sessions.append_turns(session_id, [
+            {"role": "user", "content": user_msg},
+            {"role": "model", "content": agent_response}
+        ])
     
+    if events_updated:
+        record_change(session.get('user_id'), event_change)
+
     return jsonify({
         "response": agent_response,
         "events_updated": events_updated,
@@ -755,6 +1314,8 @@ def delete_event_endpoint():
         
     access_token = session.get('access_token')
     result = delete_calendar_event(event_id, access_token=access_token)
+    if result.get("ok"):
+        record_change(session.get('user_id'), "event_deleted", event_id=event_id)
     return jsonify(result)
 
 @app.route("/generate_quiz", methods=["POST"])
@@ -762,26 +1323,16 @@ def generate_quiz_endpoint():
     """
     Generate quiz questions based on mode (upload, recall, interview).
     """
-    data = request.json
-    mode = data.get("mode")  # "upload", "recall", or "interview"
-    
-    try:
-        if mode == "upload":
-            # Quiz My Uploads mode
-            filename = data.get("filename")
-            if not filename:
-                return jsonify({"error": "No filename provided"}), 400
-            
-            # Use RAG to get context from the file
-            context = rag_system.retrieve_context(filename)
-            if not context:
-                return jsonify({"error": "File not found or no content"}), 404
-            
-            # Generate quiz prompt
-            quiz_prompt = f"""Based on the following document content, generate 5 multiple-choice questions to test understanding.
+    return resolve_llm_steps(start_quiz())
+
+QUIZ_QUESTIONS = 5
 
+def upload_quiz_prompt(content, count, section_title=""):
+    section_line = f"\n(This is one section of a longer document: {section_title})\n" if section_title else ""
+    return f"""Based on the following document content, generate {count} multiple-choice questions to test understanding.
+{section_line}
 Document Content:
-{context}
+{content}
 
 Generate questions in this EXACT JSON format:
 ```json
@@ -798,53 +1349,76 @@ Generate questions in this EXACT JSON format:
 
 Make the questions challenging but fair. The "correct" field should be the index (0-3) of the correct option."""
 
-            response = model.generate_content(quiz_prompt)
-            quiz_data = parse_json_from_response(response.text)
+def start_quiz():
+    """Build the quiz prompt; the recall mode answers from its digest, building it first if needed"""
+    data = request.json
+    mode = data.get("mode")  # "upload", "recall", or "interview"
+    
+    try:
+        if mode == "upload":
+            # Quiz My Uploads mode
+            filename = data.get("filename")
+            if not filename:
+                return jsonify({"error": "No filename provided"}), 400
             
-            if quiz_data:
-                return jsonify(quiz_data)
-            else:
-                return jsonify({"error": "Failed to generate quiz"}), 500
+            # Use RAG to get context from the file
+            context = rag_system.retrieve_context(filename)
+            if not context and not rag_ready.is_set():
+                # The file may not be indexed yet right after a restart
+                rag_ready.wait()
+                context = rag_system.retrieve_context(filename)
+            if not context:
+                return jsonify({"error": "File not found or no content"}), 404
+            
+            # Large documents are sampled down to a few sections, quizzed in parallel
+            parts = quiz_sections.plan_quiz(context, QUIZ_QUESTIONS)
+            if len(parts) == 1:
+                # The whole of a small document, or the one section sampled from a large one
+                title, text, count = parts[0]
+                return LLMStep(
+                    [("quiz_upload", upload_quiz_prompt(text, count, title))],
+                    lambda response: finish_quiz(mode, response),
+                    user_id=session.get('user_id')
+                )
+            log.debug("quiz.sections", filename=filename, chars=len(context), sections=len(parts))
+            return LLMStep(
+                [("quiz_upload_section", upload_quiz_prompt(text, count, title)) for title, text, count in parts],
+                lambda *responses: finish_section_quiz(responses),
+                user_id=session.get('user_id')
+            )
                 
         elif mode == "recall":
-            # Daily Recall mode - get yesterday's events
-            tz = get_ist_tz()
-            yesterday = dt.datetime.now(tz) - dt.timedelta(days=1)
-            start = yesterday.replace(hour=0, minute=0, second=0).isoformat()
-            end = yesterday.replace(hour=23, minute=59, second=59).isoformat()
-            
-            events_res = list_calendar_events(start, end)
-            events = events_res.get("events", [])
-            
-            if not events:
-                return jsonify({"error": "No study sessions found for yesterday"}), 404
-            
-            topics = [e.get("summary", "") for e in events]
-            topics_str = ", ".join(topics)
-            
-            quiz_prompt = f"""You studied these topics yesterday: {topics_str}
-
-Generate 5 quick recall questions to test retention. Use this EXACT JSON format:
-```json
-{{
-    "questions": [
-        {{
-            "question": "Question text here?",
-            "options": ["Option A", "Option B", "Option C", "Option D"],
-            "correct": 0
-        }}
-    ]
-}}
-```"""
-
-            response = model.generate_content(quiz_prompt)
-            quiz_data = parse_json_from_response(response.text)
-            
-            if quiz_data:
-                quiz_data["topics"] = topics
-                return jsonify(quiz_data)
+            # Daily Recall mode - served from the precomputed digest
+            user_id = session.get('user_id')
+            if not user_id:
+                return jsonify({"error": "Unauthorized"}), 401
+
+            digest = recall_digest.load_digest(user_id)
+            today = get_current_datetime()["date"]
+            if not digest or digest.get("date") != today:
+                if not recall_digest.claim_build(user_id, today):
+                    # The background job (in this or another worker) is building it right now
+                    return jsonify({"status": "building", "error": "Today's recall quiz is being prepared. Try again in a moment."}), 202
+                # Not built yet today (e.g. first visit) - build it now and keep it
+                try:
+                    digest, quiz_prompt = prepare_recall_digest(user_id, session.get('access_token'))
+                except Exception:
+                    recall_digest.release_build(user_id, today)
+                    raise
+                if digest is None:
+                    recall_digest.release_build(user_id, today)
+                    return jsonify({"error": "Failed to generate quiz"}), 500
+                if quiz_prompt is not None:
+                    return LLMStep(
+                        [("recall_digest", quiz_prompt)],
+                        lambda response: finish_recall_quiz(user_id, today, digest, response),
+                        user_id=user_id
+                    )
+                recall_digest.save_digest(user_id, digest)
             else:
-                return jsonify({"error": "Failed to generate quiz"}), 500
+                llm_usage.record_cache_hit(user_id, metrics.current_route(), "recall_digest")
+
+            return recall_quiz_response(digest)
                 
         elif mode == "interview":
             # Mock Interview mode
@@ -866,31 +1440,111 @@ Generate 3 technical/behavioral interview questions. Use this EXACT JSON format:
 
 Make questions realistic and relevant to the role."""
 
-            response = model.generate_content(interview_prompt)
-            quiz_data = parse_json_from_response(response.text)
-            
-            if quiz_data:
-                return jsonify(quiz_data)
-            else:
-                return jsonify({"error": "Failed to generate interview questions"}), 500
+            return LLMStep(
+                [("interview_questions", interview_prompt)],
+                lambda response: finish_quiz(mode, response),
+                user_id=session.get('user_id')
+            )
         else:
             return jsonify({"error": "Invalid mode"}), 400
             
+    except llm_usage.BudgetExceeded:
+        raise
+    except Exception as e:
+        log.error("quiz.generate_failed", exc_info=True, mode=mode)
+        return jsonify({"error": str(e)}), 500
+
+def finish_quiz(mode, response):
+    """Questions from Gemini's answer (upload and interview modes)"""
+    if isinstance(response, llm_usage.BudgetExceeded):
+        raise response
+    try:
+        if isinstance(response, Exception):
+            raise response
+        quiz_data = parse_json_from_response(response.text)
     except Exception as e:
-        print(f"[ERROR] Quiz generation failed: {e}")
+        log.error("quiz.generate_failed", exc_info=e, mode=mode)
         return jsonify({"error": str(e)}), 500
 
+    if quiz_data:
+        if mode == "interview":
+            # Answers sent to /interview_answer under this id are scored as they come in
+            quiz_data["interview_id"] = uuid.uuid4().hex
+        return jsonify(quiz_data)
+    if mode == "interview":
+        return jsonify({"error": "Failed to generate interview questions"}), 500
+    return jsonify({"error": "Failed to generate quiz"}), 500
+
+def finish_recall_quiz(user_id, date, digest, response):
+    """Keep the digest built from Gemini's answer, or give up today's claim on it"""
+    try:
+        if isinstance(response, Exception):
+            raise response
+        digest = complete_recall_digest(digest, response)
+    except Exception as e:
+        recall_digest.release_build(user_id, date)
+        if isinstance(e, llm_usage.BudgetExceeded):
+            raise
+        log.error("quiz.generate_failed", exc_info=e, mode="recall")
+        return jsonify({"error": str(e)}), 500
+    if digest is None:
+        recall_digest.release_build(user_id, date)
+        return jsonify({"error": "Failed to generate quiz"}), 500
+    recall_digest.save_digest(user_id, digest)
+    return recall_quiz_response(digest)
+
+def recall_quiz_response(digest):
+    """The Daily Recall quiz served from a digest"""
+    if not digest["topics"]:
+        return jsonify({"error": "No study sessions found for yesterday"}), 404
+    if not digest["questions"]:
+        return jsonify({"error": "Failed to generate quiz"}), 500
+    return jsonify({"questions": digest["questions"], "topics": digest["topics"]})
+
+def finish_section_quiz(responses):
+    """One quiz from the questions generated for each sampled section"""
+    question_lists, budget_error = [], None
+    for response in responses:
+        if isinstance(response, llm_usage.BudgetExceeded):
+            budget_error = response
+            continue
+        try:
+            if isinstance(response, Exception):
+                raise response
+            quiz_data = parse_json_from_response(response.text)
+        except Exception as e:
+            log.warning("quiz.section_failed", error=e)
+            continue
+        if isinstance(quiz_data, dict):
+            question_lists.append(quiz_data.get("questions") or [])
+
+    questions = quiz_sections.merge_questions(question_lists, QUIZ_QUESTIONS)
+    if questions:
+        return jsonify({"questions": questions})
+    if budget_error is not None:
+        raise budget_error
+    return jsonify({"error": "Failed to generate quiz"}), 500
+
 
 
 @app.route("/evaluate_interview", methods=["POST"])
 def evaluate_interview():
     """Evaluate mock interview answers"""
+    return resolve_llm_steps(start_interview_evaluation())
+
+def start_interview_evaluation():
     data = request.json
     qa_pairs = data.get("qa_pairs", [])
     job_role = data.get("job_role", "Software Developer")
     
     if not qa_pairs:
         return jsonify({"error": "No answers provided"}), 400
+
+    user_id = session.get('user_id')
+    interview_id = data.get("interview_id")
+    if interview_id and user_id:
+        # Incremental mode: most answers were scored while the user typed
+        return collect_answer_scores(user_id, interview_id, qa_pairs, job_role)
         
     # Construct prompt
     qa_text = ""
@@ -918,8 +1572,18 @@ Provide the evaluation in this EXACT JSON format:
 }}
 ```"""
 
+    return LLMStep(
+        [("interview_evaluation", prompt)],
+        finish_interview_evaluation,
+        user_id=session.get('user_id')
+    )
+
+def finish_interview_evaluation(response):
+    if isinstance(response, llm_usage.BudgetExceeded):
+        raise response
     try:
-        response = model.generate_content(prompt)
+        if isinstance(response, Exception):
+            raise response
         eval_data = parse_json_from_response(response.text)
         
         if eval_data:
@@ -933,6 +1597,234 @@ Provide the evaluation in this EXACT JSON format:
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# How long per-answer scores are kept
+INTERVIEW_ANSWER_TTL = 24 * 3600
+
+# Score of a question left blank (given without asking the model)
+UNANSWERED_SCORE = {"rating": 0, "feedback": "No answer was given."}
+
+def answer_prompt(job_role, question, answer):
+    return f"""You are an expert interviewer for the role of {job_role}.
+Rate the candidate's answer to this one question from 1 to 10 and give brief, constructive feedback: what was strong and what to improve.
+
+Question: {question}
+Answer: {answer}
+
+Provide the evaluation in this EXACT JSON format:
+```json
+{{
+    "rating": 8,
+    "feedback": "Specific feedback for this answer..."
+}}
+```"""
+
+def parse_answer_score(response):
+    """{"rating", "feedback"} from a reply to answer_prompt(), or None"""
+    if isinstance(response, Exception):
+        return None
+    try:
+        data = parse_json_from_response(response.text)
+    except Exception:
+        return None
+    if not isinstance(data, dict) or "rating" not in data:
+        return None
+    return {"rating": data["rating"], "feedback": data.get("feedback", "")}
+
+@app.route("/interview_answer", methods=["POST"])
+def submit_interview_answer():
+    """Score one mock interview answer in the background as soon as it is written"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.json
+    interview_id = data.get("interview_id")
+    question_index = data.get("question_index")
+    question = data.get("question")
+    answer = (data.get("answer") or "").strip()
+    job_role = data.get("job_role", "Software Developer")
+    if not interview_id or not isinstance(question_index, int) or not question:
+        return jsonify({"error": "interview_id, question_index and question are required"}), 400
+    if not answer:
+        return jsonify({"status": "skipped"})
+
+    storage.prune_interview_answers(INTERVIEW_ANSWER_TTL)
+    if not storage.save_interview_answer(user_id, interview_id, question_index, question, answer):
+        return jsonify({"status": "unchanged"})
+
+    prompt = answer_prompt(job_role, question, answer)
+
+    def run():
+        # The final evaluation may have taken this answer over (or it was edited) while queued
+        if not storage.move_interview_answer(user_id, interview_id, question_index, answer, "pending", "scoring"):
+            return 200, {"status": "skipped"}
+        try:
+            response = generate_content("interview_answer", prompt, user_id=user_id, route="/interview_answer")
+        except Exception as e:
+            response = e
+        score = parse_answer_score(response)
+        storage.finish_interview_answer(
+            user_id, interview_id, question_index, answer, "done" if score else "failed", **(score or {})
+        )
+        return (200, score) if score else (500, {"error": "Could not score the answer"})
+
+    try:
+        job_runner.submit(user_id, "interview_answer", run)
+    except jobs.QueueFull:
+        # Left for the final evaluation to score
+        storage.finish_interview_answer(user_id, interview_id, question_index, answer, "failed")
+        return jsonify({"status": "deferred"})
+    return jsonify({"status": "pending"}), 202
+
+def collect_answer_scores(user_id, interview_id, qa_pairs, job_role):
+    """
+    Scores of the answers already sent to /interview_answer. The rest are
+    scored in this evaluation's own calls, never waited for: answers whose
+    job hasn't started are taken over (the job then skips them), and those
+    missing, edited since, failed or still in flight are scored again.
+    Questions left blank get UNANSWERED_SCORE without a call.
+    """
+    stored = storage.interview_answers(user_id, interview_id)
+    answers = [(item.get("answer") or "").strip() for item in qa_pairs]
+    scores, missing = {}, []
+    for i, answer in enumerate(answers):
+        if not answer:
+            scores[i] = dict(UNANSWERED_SCORE)
+            continue
+        row = stored.get(i)
+        if row and row["answer"] == answer:
+            if row["status"] == "done":
+                scores[i] = {"rating": row["rating"], "feedback": row["feedback"]}
+                continue
+            if row["status"] == "pending":
+                storage.move_interview_answer(user_id, interview_id, i, answer, "pending", "claimed")
+        missing.append(i)
+
+    calls = [
+        ("interview_answer", answer_prompt(job_role, qa_pairs[i].get("question", ""), answers[i]))
+        for i in missing
+    ]
+    return LLMStep(
+        calls,
+        lambda *responses: summarize_interview(user_id, interview_id, answers, job_role, scores, missing, responses),
+        user_id=user_id
+    )
+
+def summarize_interview(user_id, interview_id, answers, job_role, scores, missing, responses):
+    """One short call turning the per-answer scores into the overall feedback"""
+    for i, response in zip(missing, responses):
+        if isinstance(response, llm_usage.BudgetExceeded):
+            raise response
+        score = parse_answer_score(response)
+        if score:
+            # Kept like a background score, so a repeated evaluation reuses it
+            storage.finish_interview_answer(user_id, interview_id, i, answers[i], "done", **score)
+        scores[i] = score or {"rating": None, "feedback": "This answer could not be evaluated."}
+
+    evaluations = [
+        {"question_index": i, "rating": scores[i]["rating"], "feedback": scores[i]["feedback"]}
+        for i in range(len(answers))
+    ]
+    notes = "\n".join(
+        f"Q{e['question_index'] + 1} ({e['rating']}/10): {e['feedback']}" for e in evaluations
+    )
+    prompt = f"""You interviewed a candidate for the role of {job_role}. Your notes on each answer:
+
+{notes}
+
+Write the overall feedback for the candidate in 3-4 sentences: a general summary of performance, their main strengths and what to work on first. Reply with the feedback text only."""
+
+    return LLMStep(
+        [("interview_summary", prompt)],
+        lambda response: finish_interview_summary(evaluations, response),
+        user_id=user_id
+    )
+
+def finish_interview_summary(evaluations, response):
+    if isinstance(response, llm_usage.BudgetExceeded):
+        raise response
+    try:
+        if isinstance(response, Exception):
+            raise response
+        overall_feedback = response.text.strip()
+    except Exception as e:
+        log.warning("interview.summary_failed", error=e)
+        ratings = [ev["rating"] for ev in evaluations if isinstance(ev["rating"], (int, float))]
+        overall_feedback = f"Average rating: {sum(ratings) / len(ratings):.1f}/10." if ratings else ""
+    return jsonify({"overall_feedback": overall_feedback, "evaluations": evaluations})
+
+# Endpoints that can also run as background jobs, by the view that starts them
+JOB_VIEWS = {
+    "generate_quiz": start_quiz,
+    "evaluate_interview": start_interview_evaluation,
+}
+
+# Bounded worker pool for jobs; finished jobs are announced on /stream
+job_runner = jobs.JobRunner(on_finish=lambda user_id, job: change_bus.publish(user_id, "job_finished", job))
+
+@app.route("/jobs/<kind>", methods=["POST"])
+def submit_job(kind):
+    """
+    Same request as POST /<kind>, answered with 202 and a job id instead of
+    waiting for Gemini. Poll /jobs/<job_id> or wait for the job_finished
+    event on /stream, then fetch /jobs/<job_id>/result.
+    """
+    start = JOB_VIEWS.get(kind)
+    if start is None:
+        return jsonify({"error": "Unknown job type"}), 404
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    # The request-bound part (body, session, retrieval) runs here; bad input
+    # and quizzes served from the recall digest are answered right away
+    step = start()
+    if not isinstance(step, LLMStep):
+        return step
+
+    def run():
+        with app.app_context():
+            try:
+                result = resolve_llm_steps(step, route=f"/{kind}")
+            except llm_usage.BudgetExceeded as e:
+                result = llm_budget_exceeded(e)
+            response = app.make_response(result)
+            return response.status_code, response.get_json()
+
+    try:
+        job_id = job_runner.submit(user_id, kind, run)
+    except jobs.QueueFull:
+        return jsonify({"error": "Too many requests in progress, try again shortly."}), 503, {"Retry-After": "5"}
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": url_for("job_status", job_id=job_id),
+        "result_url": url_for("job_result", job_id=job_id),
+    }), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+    job = storage.get_job(user_id, job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify({key: job[key] for key in ("id", "kind", "status", "created_at", "finished_at")})
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """The finished job's response, as the synchronous endpoint would have sent it"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+    job = storage.get_job(user_id, job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job["status"] in ("queued", "running"):
+        return jsonify({"id": job_id, "status": job["status"]}), 202
+    return jsonify(job["result"]), job["status_code"]
+
 
 def parse_json_from_response(text):
     """Extract JSON from markdown code blocks."""
@@ -951,19 +1843,11 @@ def list_uploads():
     user_id = session.get('user_id')
     if not user_id:
         return jsonify({"files": []})
-        
-    files = []
-    user_folder = os.path.join(UPLOAD_FOLDER, user_id)
-    
-    if os.path.exists(user_folder):
-        for filename in os.listdir(user_folder):
-            filepath = os.path.join(user_folder, filename)
-            if os.path.isfile(filepath):
-                files.append({
-                    "name": filename,
-                    "size": os.path.getsize(filepath)
-                })
-    return jsonify({"files": files})
+    return api_cache.respond(user_id, "list_uploads", lambda: build_upload_list(user_id))
+
+def build_upload_list(user_id):
+    # Served from the upload manifest: no directory scan or stat calls
+    return jsonify({"files": user_uploads(user_id)})
 
 @app.route("/delete_file", methods=["POST"])
 def delete_file():
@@ -985,8 +1869,9 @@ def delete_file():
         if os.path.exists(filepath):
             os.remove(filepath)
             # Also remove from RAG system if possible (simple implementation: just reload or ignore)
-            if filename in rag_system.documents:
-                del rag_system.documents[filename]
+            rag_system.remove_document(filename)
+            upload_manifest.remove_upload(user_id, filename)
+            record_change(user_id, "upload_deleted", filename=filename)
             return jsonify({"success": True})
         else:
             return jsonify({"error": "File not found"}), 404
@@ -997,35 +1882,29 @@ def delete_file():
 # DASHBOARD & ANALYTICS
 # ========================
 
-QUIZ_HISTORY_FILE = "quiz_history.json"
-
-def load_quiz_history():
-    if os.path.exists(QUIZ_HISTORY_FILE):
-        try:
-            with open(QUIZ_HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-def save_quiz_history(history):
-    with open(QUIZ_HISTORY_FILE, 'w') as f:
-        json.dump(history, f, indent=2)
+# Quiz results live in the append-only SQLite store (storage.py);
+# the old quiz_history.json is migrated into it on first use.
 
 @app.route("/dashboard_stats", methods=["GET"])
 def dashboard_stats():
-    """Aggregate stats for the dashboard"""
+    """Aggregate stats for the dashboard (cached per user, answers If-None-Match)"""
+    return api_cache.respond(session.get('user_id'), "dashboard_stats", build_dashboard_stats, ttl=CALENDAR_CACHE_TTL)
+
+def build_dashboard_stats():
     
     # 1. Session Count
-    session_count = len(sessions)
+    session_count = sessions.count_for_user(session.get('user_id'))
     
-    # 2. File Count
+    # 2. File Count (this user's uploads, from the manifest)
+    user_id = session.get('user_id')
     file_count = 0
-    if os.path.exists(UPLOAD_FOLDER):
-        file_count = len([f for f in os.listdir(UPLOAD_FOLDER) if allowed_file(f)])
+    if user_id:
+        user_uploads(user_id)
+        file_count = storage.upload_count(user_id)
         
     # 3. Upcoming Events (Next 7 days)
     upcoming_events = []
+    events_failed = False
     try:
         tz = get_ist_tz()
         now = dt.datetime.now(tz)
@@ -1034,7 +1913,7 @@ def dashboard_stats():
         end_time = now + dt.timedelta(days=7)
         
         access_token = session.get('access_token') # Get token from session
-        print(f"[DEBUG] /dashboard_stats: access_token ending in ...{access_token[-6:] if access_token else 'None'}")
+        recall_scheduler.touch(session.get('user_id'), access_token)
         
         if not access_token:
             # If no token, return empty events rather than falling back to server token
@@ -1048,43 +1927,20 @@ def dashboard_stats():
                 max_results=5,
                 access_token=access_token # Pass token to bridge
             )
-            print(f"[DEBUG] /dashboard_stats: list_res keys: {list_res.keys()}")
+            log.debug("dashboard.events", ok=list_res.get("ok"), events=list_res.get("events"), error=list_res.get("error"))
             
             if list_res.get("ok"):
                 upcoming_events = list_res.get("events", [])
+            else:
+                events_failed = True
     except Exception as e:
-        print(f"Error fetching dashboard events: {e}")
+        events_failed = True
+        log.warning("dashboard.events_failed", error=e)
 
-    # 4. Knowledge Stats
-    quiz_history = load_quiz_history()
-    user_id = session.get('user_id')
-    topic_stats = {}
-    
-    for entry in quiz_history:
-        # Filter by user_id
-        if entry.get("user_id") != user_id:
-            continue
-            
-        topic = entry.get("topic", "General")
-        score = entry.get("score", 0)
-        total = entry.get("total", 1)
-        percentage = (score / total) * 100
-        
-        if topic not in topic_stats:
-            topic_stats[topic] = {"total_score": 0, "count": 0}
-        
-        topic_stats[topic]["total_score"] += percentage
-        topic_stats[topic]["count"] += 1
-        
-    knowledge_profile = []
-    for topic, data in topic_stats.items():
-        avg_score = round(data["total_score"] / data["count"])
-        knowledge_profile.append({"topic": topic, "level": avg_score})
-        
-    # Sort by level descending
-    knowledge_profile.sort(key=lambda x: x["level"], reverse=True)
+    # 4. Knowledge Stats (maintained incrementally on every quiz submission)
+    knowledge_profile = storage.knowledge_profile(session.get('user_id'))
 
-    return jsonify({
+    stats = jsonify({
         "user_name": session.get('user_name', 'User'),
         "total_chats": session_count,
         "total_files": file_count,
@@ -1092,6 +1948,8 @@ def dashboard_stats():
         "upcoming_events_count": len(upcoming_events),
         "knowledge_profile": knowledge_profile
     })
+    # Don't keep a transient Calendar failure around as "no events" for the TTL
+    return uncached(stats) if events_failed else stats
 
 @app.route("/submit_quiz_result", methods=["POST"])
 def submit_quiz_result():
@@ -1104,20 +1962,22 @@ def submit_quiz_result():
     if total == 0:
         return jsonify({"error": "Invalid total score"}), 400
         
-    history = load_quiz_history()
-    history.append({
-        "date": dt.datetime.now().isoformat(),
-        "user_id": session.get('user_id'), # Save user_id
-        "topic": topic,
-        "score": score,
-        "total": total
-    })
-    save_quiz_history(history)
+    storage.append_quiz_result(
+        user_id=session.get('user_id'),
+        date=dt.datetime.now().isoformat(),
+        topic=topic,
+        score=score,
+        total=total
+    )
+    record_change(session.get('user_id'), "quiz_submitted", topic=topic)
     
     return jsonify({"success": True})
 
 @app.route("/events")
 def events_endpoint():
+    return api_cache.respond(session.get('user_id'), "events", build_events, ttl=CALENDAR_CACHE_TTL)
+
+def build_events():
     if 'access_token' not in session:
         return jsonify({"error": "Unauthorized"}), 401
 
@@ -1130,12 +1990,12 @@ def events_endpoint():
     
     access_token = session.get('access_token')
     if not access_token:
-        print("[DEBUG] /events: No access_token in session")
+        log.debug("events.no_access_token")
         return jsonify({"error": "Unauthorized"}), 401
 
-    print(f"[DEBUG] /events: Fetching events for token ending in ...{access_token[-6:]}")
     list_res = list_calendar_events(start_search, end_search, access_token=access_token)
-    print(f"[DEBUG] /events: Bridge response: {list_res}")
+    # Summary only: the Calendar payload itself never goes to the logs
+    log.debug("events.fetched", ok=list_res.get("ok"), events=list_res.get("events"), error=list_res.get("error"))
     
     if not list_res.get("ok"):
         error_msg = list_res.get("error", "")
@@ -1144,9 +2004,35 @@ def events_endpoint():
             project_id = "21392727344" # From the logs
             link = f"https://console.developers.google.com/apis/api/calendar-json.googleapis.com/overview?project={project_id}"
             return jsonify({"error": f"Google Calendar API not enabled. <a href='{link}' target='_blank'>Click here to enable it</a>, then refresh."}), 403
+        # Transient errors and expired tokens: answer, but don't cache
+        return uncached(jsonify(list_res))
             
     return jsonify(list_res)
 
+@app.route("/stream")
+def change_stream():
+    """Server-Sent Events: typed change notifications for the current user"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    # EventSource sends Last-Event-ID when it reconnects, so nothing is missed
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    if request.environ.get("studycopilot.asgi"):
+        stream = change_bus.listen(user_id, last_id)
+    else:
+        # Each stream holds a worker thread here: limit how many and for how long
+        stream = change_bus.listen(
+            user_id, last_id,
+            max_seconds=notifications.WSGI_STREAM_SECONDS,
+            max_streams=notifications.WSGI_MAX_STREAMS
+        )
+    return Response(
+        stream,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route("/mark_event_complete", methods=["POST"])
 def mark_event_complete():
     data = request.json
@@ -1165,6 +2051,8 @@ def mark_event_complete():
     # Update the event
     access_token = session.get('access_token')
     res = update_calendar_event(event_id, summary=new_summary, access_token=access_token)
+    if res.get("ok"):
+        record_change(session.get('user_id'), "event_updated", event_id=event_id)
     return jsonify(res)
 
 @app.route("/delete_calendar_event", methods=["POST"])
@@ -1178,47 +2066,36 @@ def delete_calendar_event_endpoint():
     # Delete the event using the existing delete_calendar_event function
     access_token = session.get('access_token')
     res = delete_calendar_event(event_id, access_token=access_token)
+    if res.get("ok"):
+        record_change(session.get('user_id'), "event_deleted", event_id=event_id)
     return jsonify(res)
 
-# Manual tasks storage (in-memory)
-manual_tasks = []
-task_id_counter = 1
+# Manual tasks storage (SQLite, see storage.py)
 
 @app.route("/manual_tasks", methods=["GET"])
 def get_manual_tasks():
     user_id = session.get('user_id')
-    user_tasks = [t for t in manual_tasks if t.get("user_id") == user_id]
-    return jsonify(user_tasks)
+    return jsonify(storage.tasks_for_user(user_id))
 
 @app.route("/manual_tasks", methods=["POST"])
 def create_manual_task():
-    global task_id_counter
     data = request.json
-    task = {
-        "id": task_id_counter,
-        "user_id": session.get('user_id'), # Save user_id
-        "text": data.get("text", ""),
-        "completed": False
-    }
-    manual_tasks.append(task)
-    task_id_counter += 1
+    task = storage.create_task(session.get('user_id'), data.get("text", ""))
     return jsonify(task)
 
 @app.route("/manual_tasks/<int:task_id>/toggle", methods=["PUT"])
 def toggle_manual_task(task_id):
     user_id = session.get('user_id')
-    for task in manual_tasks:
-        if task["id"] == task_id and task.get("user_id") == user_id:
-            task["completed"] = not task["completed"]
-            return jsonify(task)
+    task = storage.toggle_task(user_id, task_id)
+    if task:
+        return jsonify(task)
     return jsonify({"error": "Task not found"}), 404
 
 @app.route("/manual_tasks/<int:task_id>", methods=["DELETE"])
 def delete_manual_task(task_id):
-    global manual_tasks
     user_id = session.get('user_id')
     # Only delete if task belongs to user
-    manual_tasks = [task for task in manual_tasks if not (task["id"] == task_id and task.get("user_id") == user_id)]
+    storage.delete_task(user_id, task_id)
     return jsonify({"ok": True})
 
 if __name__ == "__main__":
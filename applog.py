@@ -0,0 +1,148 @@
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+
+
+# ========= CONFIG =========
+
+# DEBUG, INFO, WARNING, ERROR
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Default share of debug lines that are written (per-call `sample=` overrides it)
+DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE", "1.0"))
+
+# Field values are never logged in full: secrets are dropped, payloads summarized
+SECRET_KEY_PARTS = ("token", "secret", "password", "authorization", "cookie", "api_key")
+MAX_FIELD_CHARS = 200
+
+# Records waiting for the writer thread; beyond this they are dropped, not blocked on
+QUEUE_SIZE = 10000
+
+# ==========================
+
+
+def redact(key: str, value):
+    """
+    Log-safe form of one field: secrets become "[redacted]", lists and dicts
+    (e.g. Calendar responses) become their size, long strings are cut.
+    """
+    if isinstance(value, bool) or value is None:
+        return value
+    if any(part in key.lower() for part in SECRET_KEY_PARTS):
+        return "[redacted]"
+    if isinstance(value, (list, tuple, set, dict)):
+        return {"len": len(value)}
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value)
+    if len(text) > MAX_FIELD_CHARS:
+        return f"{text[:MAX_FIELD_CHARS]}...(+{len(text) - MAX_FIELD_CHARS} chars)"
+    return text
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event and fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+class DropWhenFullQueueHandler(logging.handlers.QueueHandler):
+    """Never let a slow log sink stall a request thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the record structured (the default merges everything into msg);
+        # tracebacks are rendered here because they can't cross threads
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.fields = dict(getattr(record, "fields", {}), exception=logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+            record.exc_text = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class Logger:
+    """
+    Structured logger: `log.info("upload.indexed", filename=name, chars=n)`.
+
+    Level checks happen before any field is formatted, debug lines can be
+    sampled, every field goes through `redact`, and records are handed to a
+    queue so the stderr write happens on a background thread.
+    """
+
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(name)
+
+    def _log(self, level: int, event: str, fields: dict, sample: float | None = None, exc_info=None):
+        if not self.logger.isEnabledFor(level):
+            return
+        rate = DEBUG_SAMPLE_RATE if sample is None and level == logging.DEBUG else sample
+        if rate is not None and rate < 1 and random.random() >= rate:
+            return
+        safe = {key: redact(key, value) for key, value in fields.items()}
+        if rate is not None and rate < 1:
+            safe["sample_rate"] = rate
+        self.logger.log(level, event, extra={"fields": safe}, exc_info=exc_info)
+
+    def debug(self, event: str, sample: float | None = None, **fields):
+        self._log(logging.DEBUG, event, fields, sample)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, exc_info=None, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=exc_info)
+
+
+_listener = None
+
+
+def configure(level: str = LOG_LEVEL, stream=None):
+    """
+    Route the "studycopilot" loggers through a queue to one writer thread.
+    Safe to call more than once.
+    """
+    global _listener
+    root = logging.getLogger("studycopilot")
+    root.setLevel(level)
+    root.propagate = False
+    if _listener is not None:
+        return
+
+    sink = logging.StreamHandler(stream or sys.stderr)
+    sink.setFormatter(JSONFormatter())
+    records = queue.Queue(QUEUE_SIZE)
+    root.addHandler(DropWhenFullQueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, sink, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued on exit
+    atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> Logger:
+    """Logger under "studycopilot" (e.g. get_logger("chat") -> studycopilot.chat)."""
+    return Logger(f"studycopilot.{name}")
@@ -0,0 +1,364 @@
+import io
+import os
+import sys
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Response, g
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
+
+import agent_app
+import metrics
+
+
+# ========= CONFIG =========
+
+# Threads for blocking work: Flask views, Calendar calls, SQLite, PDF extraction, retrieval
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "32"))
+
+# Bodies of the async routes (re-read by each phase) above this size are spooled to disk
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# ==========================
+
+
+app_pool = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix="asgi")
+
+
+class Responded(Exception):
+    """A view phase produced the final response."""
+
+    def __init__(self, response: Response):
+        self.response = response
+
+
+class FlaskCall:
+    """
+    One HTTP request whose blocking phases run on `app_pool`, each inside a
+    Flask request context built from the same environ (so `request`,
+    `session` and the after_request hooks work as usual). The before_request
+    hooks run once, in the first phase, and what they put on `g` (request
+    timer, profile) is carried over to the later phases.
+    """
+
+    def __init__(self, environ: dict, route: str):
+        self.environ = environ
+        self.route = route
+        self.preprocessed = False
+        self.g = {}
+
+    async def run(self, fn, *args):
+        """
+        fn(*args) on the pool. A view-style result (response or tuple) or an
+        exception ends the request with Responded; anything else is returned.
+        """
+        final, result = await asyncio.get_running_loop().run_in_executor(app_pool, self._run, fn, args)
+        if final:
+            raise Responded(result)
+        return result
+
+    def _run(self, fn, args):
+        app = agent_app.app
+        profiler = agent_app.request_profiler
+        self.environ["wsgi.input"].seek(0)
+        with app.request_context(self.environ):
+            for name, value in self.g.items():
+                setattr(g, name, value)
+            if "profile" in g:
+                profiler.attach(g.profile)
+            try:
+                result = None
+                if not self.preprocessed:
+                    self.preprocessed = True
+                    result = app.preprocess_request()
+                if result is None:
+                    result = fn(*args)
+                if not isinstance(result, (Response, tuple)):
+                    # More phases follow: keep the profile out of this context's teardown
+                    self.g = dict(vars(g))
+                    if "profile" in g:
+                        profiler.detach(g.pop("profile"))
+                    return False, result
+                response = app.make_response(result)
+            except Exception as e:
+                try:
+                    response = app.make_response(app.handle_user_exception(e))
+                except Exception as unhandled:
+                    response = app.make_response(app.handle_exception(unhandled))
+            return True, app.process_response(response)
+
+
+def _reraise(e: Exception):
+    raise e
+
+
+async def resolve_llm_steps(call: FlaskCall, result):
+    """Async counterpart of agent_app.resolve_llm_steps: await the Gemini calls concurrently"""
+    while isinstance(result, agent_app.LLMStep):
+        step = result
+        with metrics.span(step.stage, call.route):
+            responses = await asyncio.gather(*(
+                agent_app.generate_content_async(
+                    prompt_type, contents, user_id=step.user_id, route=call.route, executor=app_pool
+                )
+                for prompt_type, contents in step.calls
+            ), return_exceptions=True)
+        result = await call.run(step.then, *responses)
+    return result
+
+
+def llm_view(start):
+    async def handler(call: FlaskCall):
+        await resolve_llm_steps(call, await call.run(start))
+        raise RuntimeError(f"{start.__name__} returned neither a response nor an LLMStep")
+    return handler
+
+
+# Routes whose Gemini wait is awaited instead of blocking a thread
+ASYNC_ROUTES = {
+    ("POST", "/chat"): llm_view(agent_app.start_chat_turn),
+    ("POST", "/generate_quiz"): llm_view(agent_app.start_quiz),
+    ("POST", "/evaluate_interview"): llm_view(agent_app.start_interview_evaluation),
+}
+
+
+def build_environ(scope: dict, body) -> dict:
+    """WSGI environ for an ASGI HTTP scope (PEP 3333 string handling)"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        # Lets views tell ASGI mode apart (e.g. /stream needs no thread cap here)
+        "studycopilot.asgi": True,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            key = name
+        else:
+            key = f"HTTP_{name}"
+        if key in environ:
+            value = environ[key] + ("; " if key == "HTTP_COOKIE" else ",") + value
+        environ[key] = value
+    return environ
+
+
+class ReceiveStream(io.RawIOBase):
+    """
+    wsgi.input for the plain Flask routes: the body is pulled from the ASGI
+    receive channel only as the view reads it, so an upload goes straight
+    into upload_stream in one pass. Read from pool threads only - each read
+    waits on the event loop.
+    """
+
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.pending = memoryview(b"")
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending and not self.finished:
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            if message["type"] == "http.disconnect":
+                self.finished = True
+                raise ClientDisconnected()
+            self.pending = memoryview(message.get("body", b""))
+            self.finished = not message.get("more_body", False)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+async def read_body(receive, limit: int | None):
+    """The whole request body of an async route, spooled to disk past SPOOL_MAX_MEMORY"""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if limit is not None and size > limit:
+            body.close()
+            raise RequestEntityTooLarge()
+        body.write(chunk)
+        if not message.get("more_body"):
+            body.seek(0)
+            return body
+
+
+def run_wsgi(environ: dict):
+    """Call the Flask app as a WSGI server would; returns (status, headers, body iterable)"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = headers
+
+    body = agent_app.app(environ, start_response)
+    return started["status"], started["headers"], body
+
+
+async def send_response(send, status: int, headers: list, chunks):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    })
+    for chunk in chunks:
+        if chunk:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def stream_body(send, body):
+    """
+    Relay a streamed WSGI body (Server-Sent Events on /stream) from its own
+    thread, so a long-lived stream doesn't occupy a pool thread.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    closed = threading.Event()
+
+    def pump():
+        try:
+            for chunk in body:
+                if closed.is_set():
+                    break
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+        except RuntimeError:
+            pass  # event loop already closed
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+
+    threading.Thread(target=pump, name="asgi-stream", daemon=True).start()
+    try:
+        while (chunk := await chunks.get()) is not None:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        # The client went away: the pump stops at the stream's next chunk (or heartbeat)
+        closed.set()
+
+
+async def handle_http(scope, receive, send):
+    handler = ASYNC_ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        body = io.BufferedReader(ReceiveStream(receive, asyncio.get_running_loop()))
+        environ = build_environ(scope, body)
+        # The body ends where the client's does; werkzeug still enforces MAX_CONTENT_LENGTH
+        environ["wsgi.input_terminated"] = True
+        await serve_wsgi(send, environ)
+        return
+
+    try:
+        body = await read_body(receive, agent_app.app.config.get("MAX_CONTENT_LENGTH"))
+    except RequestEntityTooLarge:
+        limit_mb = agent_app.upload_stream.MAX_UPLOAD_BYTES // (1024 * 1024)
+        payload = f'{{"error": "File is too large (limit {limit_mb} MB)."}}'.encode()
+        await send_response(send, 413, [("Content-Type", "application/json")], [payload])
+        return
+    if body is None:
+        return
+
+    try:
+        call = FlaskCall(build_environ(scope, body), scope["path"])
+        try:
+            try:
+                await handler(call)
+            except Responded:
+                raise
+            except Exception as e:
+                await call.run(_reraise, e)
+        except Responded as done:
+            response = done.response
+            await send_response(send, response.status_code, response.headers.to_wsgi_list(), [response.get_data()])
+    finally:
+        body.close()
+
+
+async def serve_wsgi(send, environ: dict):
+    """Any other route: the unchanged Flask view on the pool"""
+    loop = asyncio.get_running_loop()
+    status, headers, wsgi_body = await loop.run_in_executor(app_pool, run_wsgi, environ)
+    content_type = next((v for k, v in headers if k.lower() == "content-type"), "")
+    if content_type.startswith("text/event-stream"):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        })
+        await stream_body(send, wsgi_body)
+        return
+
+    def drain():
+        try:
+            return [chunk for chunk in wsgi_body]
+        finally:
+            if hasattr(wsgi_body, "close"):
+                wsgi_body.close()
+    await send_response(send, status, headers, await loop.run_in_executor(app_pool, drain))
+
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Import the Gemini client now rather than on the event loop later
+            await asyncio.get_running_loop().run_in_executor(app_pool, agent_app.get_model)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            app_pool.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    ASGI serving mode: `uvicorn asgi:app` (or any ASGI server) instead of the
+    threaded WSGI server.
+
+    /chat, /generate_quiz and /evaluate_interview run as coroutines: their
+    blocking parts (session, Calendar, SQLite, retrieval) run on a thread pool
+    inside a normal Flask request context, and the Gemini wait in between is
+    awaited on the event loop, so it holds no thread. Every other route is the
+    unchanged Flask view, run on the same pool. Routes, cookies and sessions
+    behave exactly as under `python agent_app.py`.
+    """
+    if scope["type"] == "http":
+        await handle_http(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await handle_lifespan(receive, send)
+    elif scope["type"] == "websocket":
+        # No websocket routes: refuse the handshake (the server answers 403)
+        if (await receive())["type"] == "websocket.connect":
+            await send({"type": "websocket.close", "code": 1008})
+    # Other scope types are ignored
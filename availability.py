@@ -0,0 +1,191 @@
+import bisect
+import datetime as dt
+
+
+# ========= CONFIG =========
+
+# Study blocks are never placed outside this daily window (local hours)
+EARLIEST_HOUR = 8
+LATEST_HOUR = 22
+
+# Breathing room kept between a study block and anything around it
+GAP_MINUTES = 15
+
+# Fallback length for events that arrive without an end time
+DEFAULT_BLOCK_MINUTES = 60
+
+# How far ahead the slot-finder is allowed to look for a free slot
+SEARCH_DAYS = 31
+
+# ==========================
+
+
+def parse_iso(value: str) -> dt.datetime:
+    """
+    Parse an RFC3339 / ISO-8601 datetime string (accepts a trailing 'Z').
+    """
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return dt.datetime.fromisoformat(value)
+
+
+class BusyIndex:
+    """
+    Sorted, non-overlapping index of busy intervals.
+
+    Intervals are merged on insert, so `starts` and `ends` stay sorted and
+    every lookup is a bisect followed by a short forward walk. `until` is
+    where the busy data ends (None: unbounded); past it nothing is known.
+    """
+
+    def __init__(self, intervals=None, until: dt.datetime | None = None):
+        self.starts = []
+        self.ends = []
+        self.until = until
+        for start, end in sorted(intervals or []):
+            self.add(start, end)
+
+    @classmethod
+    def from_freebusy(cls, busy: list[dict], until: dt.datetime | None = None) -> "BusyIndex":
+        """
+        Build the index from a Calendar free/busy 'busy' list covering up to `until`.
+        """
+        return cls(((parse_iso(b["start"]), parse_iso(b["end"])) for b in busy), until)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start: dt.datetime, end: dt.datetime):
+        """
+        Insert [start, end), merging it with any interval it touches.
+        """
+        if end <= start:
+            return
+        i = bisect.bisect_left(self.ends, start)
+        j = bisect.bisect_right(self.starts, end)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def overlapping(self, start: dt.datetime, end: dt.datetime) -> list[tuple]:
+        """
+        Return the busy intervals that intersect [start, end).
+        """
+        i = bisect.bisect_right(self.ends, start)
+        j = bisect.bisect_left(self.starts, end)
+        return list(zip(self.starts[i:j], self.ends[i:j]))
+
+    def next_free(self, start: dt.datetime, duration: dt.timedelta, gap: dt.timedelta = dt.timedelta(0)):
+        """
+        Earliest slot of `duration` starting at or after `start` that keeps
+        `gap` clear on both sides. Ignores daily hour limits.
+        """
+        i = bisect.bisect_right(self.ends, start - gap)
+        while i < len(self.starts) and self.starts[i] < start + duration + gap:
+            start = max(start, self.ends[i] + gap)
+            i += 1
+        return start, start + duration
+
+
+def find_slot(index: BusyIndex, not_before: dt.datetime, duration: dt.timedelta,
+              earliest_hour: int = EARLIEST_HOUR, latest_hour: int = LATEST_HOUR,
+              gap_minutes: int = GAP_MINUTES, search_days: int = SEARCH_DAYS):
+    """
+    Earliest free slot of `duration` at or after `not_before` that fits inside
+    the daily [earliest_hour, latest_hour) window. Returns (start, end) or None,
+    also when the slot would lie past the end of the index's busy data.
+    """
+    gap = dt.timedelta(minutes=gap_minutes)
+    cursor = not_before
+    horizon = not_before + dt.timedelta(days=search_days)
+    if index.until is not None:
+        horizon = min(horizon, index.until)
+
+    while cursor < horizon:
+        day_open = cursor.replace(hour=earliest_hour, minute=0, second=0, microsecond=0)
+        day_close = cursor.replace(hour=0, minute=0, second=0, microsecond=0) + dt.timedelta(hours=latest_hour)
+        if cursor < day_open:
+            cursor = day_open
+
+        start, end = index.next_free(cursor, duration, gap)
+        # Busy blocks may come back in UTC; compare days in the caller's timezone
+        start, end = start.astimezone(cursor.tzinfo), end.astimezone(cursor.tzinfo)
+        if start.date() == day_open.date() and end <= day_close:
+            if index.until is not None and end > index.until:
+                return None
+            return start, end
+
+        # Nothing left today: jump to the opening of the next day
+        cursor = day_open + dt.timedelta(days=1)
+
+    return None
+
+
+def schedule_events(events: list[dict], index: BusyIndex, now: dt.datetime, **constraints) -> list[dict]:
+    """
+    Fit a batch of `create_events` items around the busy index.
+
+    Events keep their requested time when it is free; otherwise they move to
+    the nearest free slot at or after it. Events without a start time are
+    placed after the previous event. Each returned event gets its final
+    `start_iso`/`end_iso` and a `rescheduled` flag; events that don't fit
+    before the end of the busy data are flagged `unscheduled`.
+    """
+    scheduled = []
+    cursor = now
+    for event in events:
+        event = dict(event)
+        start = parse_iso(event["start_iso"]) if event.get("start_iso") else None
+        if start is not None:
+            # Keep the daily hour window in the user's local timezone
+            start = start.replace(tzinfo=now.tzinfo) if start.tzinfo is None else start.astimezone(now.tzinfo)
+
+        if start is not None and event.get("end_iso"):
+            end = parse_iso(event["end_iso"])
+            duration = (end if end.tzinfo else end.replace(tzinfo=now.tzinfo)) - start
+        else:
+            duration = dt.timedelta(minutes=int(event.get("duration_minutes") or DEFAULT_BLOCK_MINUTES))
+        if duration <= dt.timedelta(0):
+            duration = dt.timedelta(minutes=DEFAULT_BLOCK_MINUTES)
+
+        wanted = max(start or cursor, now)
+        slot = find_slot(index, wanted, duration, **constraints)
+        if slot is None:
+            event["unscheduled"] = True
+            scheduled.append(event)
+            continue
+
+        index.add(*slot)
+        event["start_iso"] = slot[0].isoformat()
+        event["end_iso"] = slot[1].isoformat()
+        event["rescheduled"] = start is None or slot[0] != start
+        scheduled.append(event)
+        cursor = slot[1]
+
+    return scheduled
+
+
+def free_slots(index: BusyIndex, window_start: dt.datetime, window_end: dt.datetime,
+               min_minutes: int = 30, earliest_hour: int = EARLIEST_HOUR,
+               latest_hour: int = LATEST_HOUR) -> list[tuple]:
+    """
+    List free gaps of at least `min_minutes` inside the daily hour window,
+    between window_start and window_end. Used to show Gemini real openings.
+    """
+    slots = []
+    minimum = dt.timedelta(minutes=min_minutes)
+    day = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < window_end:
+        open_at = max(day + dt.timedelta(hours=earliest_hour), window_start)
+        close_at = min(day + dt.timedelta(hours=latest_hour), window_end)
+        cursor = open_at
+        for busy_start, busy_end in index.overlapping(open_at, close_at):
+            if busy_start - cursor >= minimum:
+                slots.append((cursor, busy_start.astimezone(cursor.tzinfo)))
+            cursor = max(cursor, busy_end.astimezone(cursor.tzinfo))
+        if close_at - cursor >= minimum:
+            slots.append((cursor, close_at))
+        day += dt.timedelta(days=1)
+    return slots
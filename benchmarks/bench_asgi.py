@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Paths given on the command line are relative to where the script was started
+START_DIR = os.getcwd()
+
+# Run inside a scratch directory so uploads and the database don't touch real data
+os.chdir(tempfile.mkdtemp(prefix="studycopilot-asgi-"))
+
+from stubs import ScriptedModel, import_app, percentile
+
+agent_app = import_app()
+import asgi
+from fake_calendar import FakeCalendar
+
+
+CHAT_BODY = json.dumps({"message": "Can you explain photosynthesis in simple terms?"}).encode()
+
+
+async def asgi_request(method: str, path: str, body: bytes = b"", cookie: str = None):
+    """
+    One request straight into asgi.app (no server, no sockets).
+    Returns (status, headers dict, body).
+    """
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+    scope = {
+        "type": "http", "http_version": "1.1", "scheme": "http", "method": method, "path": path,
+        "root_path": "", "query_string": b"", "headers": headers,
+        "server": ("127.0.0.1", 8000), "client": ("127.0.0.1", 50000),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi.app(scope, receive, send)
+    start = messages[0]
+    response_headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start["status"], response_headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def login_body(user_id: str) -> bytes:
+    return json.dumps({"uid": user_id, "name": user_id, "email": f"{user_id}@example.com",
+                       "access_token": f"token-{user_id}"}).encode()
+
+
+async def run_asgi(chats: int) -> dict:
+    status, headers, _ = await asgi_request("POST", "/auth/login", login_body("asgi-user"))
+    assert status == 200, status
+    cookie = headers["set-cookie"].split(";", 1)[0]
+
+    async def one():
+        started = time.perf_counter()
+        status, _, body = await asgi_request("POST", "/chat", CHAT_BODY, cookie)
+        return status, (time.perf_counter() - started) * 1000
+
+    peak_threads = threading.active_count()
+    started = time.perf_counter()
+    pending = [asyncio.ensure_future(one()) for _ in range(chats)]
+    while not all(p.done() for p in pending):
+        peak_threads = max(peak_threads, threading.active_count())
+        await asyncio.sleep(0.01)
+    results = [p.result() for p in pending]
+    return summarize("asgi", chats, results, time.perf_counter() - started, peak_threads)
+
+
+def run_threads(chats: int, threads: int) -> dict:
+    """The same chats through the WSGI app with a fixed number of worker threads"""
+    local = threading.local()
+
+    def one(_):
+        if not hasattr(local, "client"):
+            local.client = agent_app.app.test_client()
+            local.client.post("/auth/login", data=login_body("wsgi-user"), content_type="application/json")
+        started = time.perf_counter()
+        response = local.client.post("/chat", data=CHAT_BODY, content_type="application/json")
+        return response.status_code, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one, range(chats)))
+    return summarize(f"wsgi ({threads} threads)", chats, results, time.perf_counter() - started, threads)
+
+
+def summarize(mode: str, chats: int, results: list, elapsed: float, threads: int) -> dict:
+    latencies = [ms for _, ms in results]
+    return {
+        "mode": mode,
+        "concurrent_chats": chats,
+        "errors": sum(1 for status, _ in results if status != 200),
+        "seconds": round(elapsed, 2),
+        "chats_per_second": round(chats / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "threads": threads,
+    }
+
+
+def run(levels: list[int], llm_ms: float, threads: int) -> dict:
+    agent_app.model = ScriptedModel("Here is a short explanation. Keep practising!", latency=llm_ms / 1000)
+    results = []
+    with FakeCalendar().installed():
+        for chats in levels:
+            results.append(asyncio.run(run_asgi(chats)))
+            results.append(run_threads(chats, threads))
+            for r in results[-2:]:
+                print(f"  {r['mode']:<20}{chats:>5} chats: {r['seconds']:>6.2f} s  p99 {r['p99_ms']:>8.1f} ms", file=sys.stderr)
+    return {"config": {"levels": levels, "llm_latency_ms": llm_ms, "threads": threads}, "results": results}
+
+
+def print_report(report: dict):
+    print(f"ASGI vs threaded WSGI, concurrent /chat: {report['config']}")
+    print(f"{'mode':<22}{'chats':>7}{'seconds':>9}{'chats/s':>9}{'p50':>9}{'p99':>9}{'threads':>9}{'errors':>8}")
+    for r in report["results"]:
+        print(f"{r['mode']:<22}{r['concurrent_chats']:>7}{r['seconds']:>9.2f}{r['chats_per_second']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['threads']:>9}{r['errors']:>8}")
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent /chat requests waiting on a slow model: ASGI mode vs a fixed thread pool.")
+    parser.add_argument("--levels", type=int_list, default=[10, 100, 300], help="Comma-separated concurrent chat counts.")
+    parser.add_argument("--llm-ms", type=float, default=1000.0, help="Simulated Gemini latency per call.")
+    parser.add_argument("--threads", type=int, default=asgi.ASGI_THREADS, help="Worker threads for the WSGI comparison.")
+    parser.add_argument("--json", help="Also write the report to this JSON file.")
+    args = parser.parse_args()
+
+    report = run(args.levels, args.llm_ms, args.threads)
+    print_report(report)
+    if args.json:
+        with open(os.path.join(START_DIR, args.json), "w") as f:
+            json.dump(report, f, indent=2)
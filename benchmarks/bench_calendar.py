@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import argparse
+import contextlib
+import io
+import statistics
+import tempfile
+import datetime as dt
+from collections import Counter
+
+# Paths given on the command line are relative to where the script was started
+START_DIR = os.getcwd()
+
+# Run inside a scratch directory so the app's uploads/database stay out of the checkout
+os.chdir(tempfile.mkdtemp(prefix="studycopilot-calendar-bench-"))
+
+from stubs import ScriptedModel, import_app, percentile
+
+agent_app = import_app()
+from fake_calendar import FakeCalendar
+
+
+ACCESS_TOKEN = "bench-token"
+
+
+def action_reply(payload: dict) -> str:
+    return f"Sure, done.\n```json\n{json.dumps(payload)}\n```"
+
+
+def seed_calendar(fake: FakeCalendar, count: int):
+    """
+    Spread `count` one-hour events over the next two weeks.
+    """
+    now = dt.datetime.now(agent_app.get_ist_tz()).replace(minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(count):
+        start = now + dt.timedelta(hours=3 * i + 1)
+        events.append({
+            "summary": f"Seeded block {i}",
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": (start + dt.timedelta(hours=1)).isoformat()},
+        })
+    fake.seed_events(ACCESS_TOKEN, events)
+
+
+def any_event_id(fake: FakeCalendar) -> str:
+    return next(iter(fake.calendars[ACCESS_TOKEN]))
+
+
+def scenarios(model: ScriptedModel, fake: FakeCalendar):
+    """
+    name -> callable(client) that performs one request.
+    """
+    tomorrow = (dt.datetime.now(agent_app.get_ist_tz()) + dt.timedelta(days=1)).replace(
+        hour=10, minute=0, second=0, microsecond=0
+    )
+
+    def events(client):
+        return client.get("/events")
+
+    def dashboard(client):
+        return client.get("/dashboard_stats")
+
+    def chat_create_events(client):
+        model.reply = action_reply({
+            "action": "create_events",
+            "events": [
+                {
+                    "summary": f"Study block {i}",
+                    "start_iso": (tomorrow + dt.timedelta(hours=2 * i)).isoformat(),
+                    "end_iso": (tomorrow + dt.timedelta(hours=2 * i + 1)).isoformat(),
+                }
+                for i in range(3)
+            ],
+        })
+        return client.post("/chat", json={"message": "schedule this plan"})
+
+    def chat_update_event(client):
+        model.reply = action_reply({
+            "action": "update_event",
+            "eventId": any_event_id(fake),
+            "start_iso": tomorrow.isoformat(),
+            "end_iso": (tomorrow + dt.timedelta(hours=1)).isoformat(),
+        })
+        return client.post("/chat", json={"message": "reschedule my next session"})
+
+    def chat_delete_event(client):
+        model.reply = action_reply({"action": "delete_event", "eventId": any_event_id(fake)})
+        return client.post("/chat", json={"message": "delete my next session"})
+
+    def mark_complete(client):
+        return client.post("/mark_event_complete", json={"event_id": any_event_id(fake), "summary": "Seeded"})
+
+    return {
+        "GET /events": events,
+        "GET /dashboard_stats": dashboard,
+        "chat create_events": chat_create_events,
+        "chat update_event": chat_update_event,
+        "chat delete_event": chat_delete_event,
+        "POST /mark_event_complete": mark_complete,
+    }
+
+
+def run(iterations: int, latency_ms: float, error_rate: float, seeded: int, seed: int) -> dict:
+    fake = FakeCalendar(latency=latency_ms / 1000, error_rate=error_rate, seed=seed)
+    model = ScriptedModel()
+    agent_app.model = model
+
+    client = agent_app.app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = "bench-user"
+        s["user_name"] = "Bench"
+        s["access_token"] = ACCESS_TOKEN
+
+    results = {}
+    with fake.installed():
+        for name, scenario in scenarios(model, fake).items():
+            timings = []
+            calls = Counter()
+            errors = 0
+            for _ in range(iterations):
+                # Keep the calendar populated so update/delete always have a target
+                if len(fake.calendars.get(ACCESS_TOKEN, {})) < seeded:
+                    seed_calendar(fake, seeded)
+                before = Counter(fake.calls)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    started = time.perf_counter()
+                    response = scenario(client)
+                    timings.append((time.perf_counter() - started) * 1000)
+                calls.update(Counter(fake.calls) - before)
+                body = response.get_json(silent=True)
+                if response.status_code >= 400 or (isinstance(body, dict) and body.get("ok") is False):
+                    errors += 1
+
+            results[name] = {
+                "iterations": iterations,
+                "errors": errors,
+                "mean_ms": round(statistics.mean(timings), 3),
+                "p50_ms": round(percentile(timings, 50), 3),
+                "p95_ms": round(percentile(timings, 95), 3),
+                "max_ms": round(max(timings), 3),
+                "api_calls_per_request": {op: round(n / iterations, 2) for op, n in sorted(calls.items())},
+            }
+
+    return {
+        "config": {
+            "iterations": iterations,
+            "latency_ms": latency_ms,
+            "error_rate": error_rate,
+            "seeded_events": seeded,
+        },
+        "results": results,
+    }
+
+
+def print_report(report: dict):
+    print(f"Calendar benchmark: {report['config']}")
+    print(f"{'operation':<28}{'mean':>10}{'p50':>10}{'p95':>10}{'errors':>8}  api calls/request")
+    for name, r in report["results"].items():
+        calls = ", ".join(f"{op}={n}" for op, n in r["api_calls_per_request"].items()) or "-"
+        print(f"{name:<28}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['errors']:>8}  {calls}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark calendar code paths against the offline fake Calendar API.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated latency per Calendar API round trip.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that a Calendar API round trip fails.")
+    parser.add_argument("--events", type=int, default=20, help="Events kept in the fake calendar.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the report to this JSON file.")
+    args = parser.parse_args()
+
+    report = run(args.iterations, args.latency_ms, args.error_rate, args.events, args.seed)
+    print_report(report)
+    if args.json:
+        with open(os.path.join(START_DIR, args.json), "w") as f:
+            json.dump(report, f, indent=2)
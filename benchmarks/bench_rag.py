@@ -0,0 +1,304 @@
+import os
+import gc
+import json
+import time
+import random
+import argparse
+import tempfile
+import resource
+import statistics
+import tracemalloc
+
+# Paths given on the command line are relative to where the script was started
+START_DIR = os.getcwd()
+
+# Run inside a scratch directory so generated PDFs and the app's uploads/database stay out of the checkout
+os.chdir(tempfile.mkdtemp(prefix="studycopilot-rag-bench-"))
+
+from stubs import import_app, percentile
+
+agent_app = import_app()
+
+
+# Retrieval only matches query words longer than 4 characters, so most of the
+# vocabulary is long enough to hit; short filler words never match
+TOPIC_WORDS = [
+    "photosynthesis", "chlorophyll", "mitochondria", "respiration", "enzymes", "osmosis",
+    "recursion", "algorithm", "complexity", "graphs", "sorting", "hashing", "pointers",
+    "integral", "derivative", "matrices", "vectors", "eigenvalue", "probability", "variance",
+    "revolution", "parliament", "empire", "treaty", "economics", "inflation", "markets",
+    "electrons", "momentum", "velocity", "gravity", "thermodynamics", "entropy", "circuits",
+]
+FILLER_WORDS = ["the", "of", "and", "a", "to", "in", "is", "for", "on", "with", "as", "by"]
+
+# (share of documents, min paragraphs, max paragraphs): mostly notes, some chapters, a few books
+SIZE_MIX = [(0.70, 2, 6), (0.25, 10, 40), (0.05, 100, 250)]
+WORDS_PER_PARAGRAPH = 45
+
+
+def make_paragraph(rng: random.Random) -> str:
+    return " ".join(
+        rng.choice(TOPIC_WORDS) if rng.random() < 0.3 else rng.choice(FILLER_WORDS)
+        for _ in range(WORDS_PER_PARAGRAPH)
+    )
+
+
+def make_document(rng: random.Random) -> str:
+    roll = rng.random()
+    for share, low, high in SIZE_MIX:
+        if roll < share:
+            break
+        roll -= share
+    return "\n\n".join(make_paragraph(rng) for _ in range(rng.randint(low, high)))
+
+
+def make_corpus(size: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    return {f"doc-{i:05d}.txt": make_document(rng) for i in range(size)}
+
+
+def make_queries(corpus: dict, count: int, seed: int) -> list[tuple[str, str]]:
+    """
+    (kind, query) pairs: topic searches that hit, searches that match nothing,
+    and exact filenames (the quiz path returns the whole document).
+    """
+    rng = random.Random(seed)
+    names = list(corpus)
+    queries = []
+    for i in range(count):
+        kind = ("hit", "miss", "filename")[i % 3]
+        if kind == "hit":
+            query = " ".join(rng.sample(TOPIC_WORDS, 3))
+        elif kind == "miss":
+            query = "zymurgy xenolith quokkas"
+        else:
+            query = rng.choice(names)
+        queries.append((kind, query))
+    return queries
+
+
+def write_pdf(path: str, pages: int, rng: random.Random):
+    """
+    Minimal text PDF (Helvetica, ~40 lines per page) that pypdf can extract.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for _ in range(pages):
+        lines = [make_paragraph(rng)[:90] for _ in range(40)]
+        text = " T* ".join(f"({line}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 40 780 Td {text} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_number = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_number
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def summarize(timings_ms: list[float]) -> dict:
+    return {
+        "mean_ms": round(statistics.mean(timings_ms), 4),
+        "p50_ms": round(percentile(timings_ms, 50), 4),
+        "p95_ms": round(percentile(timings_ms, 95), 4),
+        "p99_ms": round(percentile(timings_ms, 99), 4),
+        "max_ms": round(max(timings_ms), 4),
+    }
+
+
+def bench_ingest(corpus: dict) -> tuple[dict, "agent_app.SimpleRAG"]:
+    rag = agent_app.SimpleRAG()
+    timings = []
+    started = time.perf_counter()
+    for name, text in corpus.items():
+        t0 = time.perf_counter()
+        rag.add_document(name, text)
+        timings.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(len(t) for t in corpus.values())
+    return dict(
+        summarize(timings),
+        docs_per_s=round(len(corpus) / elapsed, 1),
+        mb_per_s=round(total_bytes / elapsed / 1e6, 2),
+    ), rag
+
+
+def measure_index_memory(size: int, seed: int) -> dict:
+    """
+    Bytes held by a freshly built index, text included (tracemalloc, in a
+    separate pass so tracing overhead doesn't skew the timings).
+    """
+    gc.collect()
+    tracemalloc.start()
+    rag = agent_app.SimpleRAG()
+    corpus_bytes = 0
+    for name, text in make_corpus(size, seed).items():
+        corpus_bytes += len(text)
+        rag.add_document(name, text)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rag
+    return {
+        "corpus_mb": round(corpus_bytes / 1e6, 2),
+        "index_retained_mb": round(retained / 1e6, 2),
+        "ingest_peak_traced_mb": round(peak / 1e6, 2),
+    }
+
+
+def bench_retrieve(rag, queries: list[tuple[str, str]], sources: set | None = None) -> dict:
+    by_kind = {}
+    started = time.perf_counter()
+    for kind, query in queries:
+        t0 = time.perf_counter()
+        rag.retrieve_context(query, sources=sources)
+        by_kind.setdefault(kind, []).append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    result = {kind: summarize(timings) for kind, timings in by_kind.items()}
+    result["queries_per_s"] = round(len(queries) / elapsed, 1)
+    return result
+
+
+def bench_extract(page_counts: list[int], repeats: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    results = {}
+    for pages in page_counts:
+        path = f"synthetic-{pages}p.pdf"
+        write_pdf(path, pages, rng)
+        # Untimed first run: pays for the deferred pypdf import
+        chars = len(agent_app.extract_text_from_file(path))
+        timings = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            chars = len(agent_app.extract_text_from_file(path))
+            timings.append((time.perf_counter() - t0) * 1000)
+        results[f"{pages}_pages"] = dict(
+            summarize(timings),
+            ms_per_page=round(statistics.mean(timings) / pages, 3),
+            file_kb=round(os.path.getsize(path) / 1024, 1),
+            chars=chars,
+        )
+    return results
+
+
+def run(sizes: list[int], queries: int, pdf_pages: list[int], pdf_repeats: int, seed: int, memory: bool) -> dict:
+    corpora = {}
+    for size in sizes:
+        corpus = make_corpus(size, seed)
+        ingest, rag = bench_ingest(corpus)
+        query_set = make_queries(corpus, queries, seed)
+        # Per-user search: restricted to ~10 of the user's files, as in the recall digest
+        user_files = set(list(corpus)[:10])
+        corpora[str(size)] = {
+            "documents": size,
+            "ingest": ingest,
+            "retrieve": bench_retrieve(rag, query_set),
+            "retrieve_user_sources": bench_retrieve(rag, query_set, sources=user_files),
+            "memory": measure_index_memory(size, seed) if memory else None,
+        }
+        del rag, corpus
+        gc.collect()
+
+    return {
+        "config": {
+            "sizes": sizes,
+            "queries": queries,
+            "pdf_pages": pdf_pages,
+            "pdf_repeats": pdf_repeats,
+            "seed": seed,
+        },
+        "corpora": corpora,
+        "extract_pdf": bench_extract(pdf_pages, pdf_repeats, seed),
+        # Linux reports kilobytes
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def flatten(report: dict, prefix: str = "") -> dict:
+    """{"corpora.100.ingest.p50_ms": 0.01, ...} for baseline comparison."""
+    flat = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(report: dict, baseline: dict) -> list[tuple[str, float, float, float]]:
+    """(metric, baseline, current, ratio) for every timing, throughput and memory number both runs have."""
+    current, previous = flatten(report), flatten(baseline)
+    rows = []
+    for metric in sorted(current.keys() & previous.keys()):
+        if metric.startswith("config.") or not previous[metric]:
+            continue
+        rows.append((metric, previous[metric], current[metric], current[metric] / previous[metric]))
+    return rows
+
+
+def print_report(report: dict):
+    print(f"RAG benchmark: {report['config']}")
+    print(f"{'docs':>7}{'ingest p50':>12}{'docs/s':>10}{'hit p50':>10}{'hit p95':>10}{'miss p50':>10}{'file p50':>10}{'qps':>8}{'index MB':>10}")
+    for size, c in report["corpora"].items():
+        r = c["retrieve"]
+        memory = f"{c['memory']['index_retained_mb']:>10.2f}" if c["memory"] else f"{'-':>10}"
+        print(
+            f"{size:>7}{c['ingest']['p50_ms']:>12.4f}{c['ingest']['docs_per_s']:>10.0f}"
+            f"{r['hit']['p50_ms']:>10.3f}{r['hit']['p95_ms']:>10.3f}{r['miss']['p50_ms']:>10.3f}"
+            f"{r['filename']['p50_ms']:>10.4f}{r['queries_per_s']:>8.0f}{memory}"
+        )
+    print(f"{'pdf':>10}{'mean ms':>9}{'ms/page':>10}{'KB':>10}")
+    for name, e in report["extract_pdf"].items():
+        print(f"{name:>10}{e['mean_ms']:>9.2f}{e['ms_per_page']:>10.3f}{e['file_kb']:>10.1f}")
+    print(f"max RSS: {report['max_rss_mb']} MB")
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SimpleRAG ingestion/retrieval and PDF extraction on synthetic corpora.")
+    parser.add_argument("--sizes", type=int_list, default=[10, 100, 1000, 10000], help="Comma-separated corpus sizes (documents).")
+    parser.add_argument("--queries", type=int, default=60, help="Retrieval queries per corpus (hits, misses and filenames).")
+    parser.add_argument("--pdf-pages", type=int_list, default=[1, 10, 50], help="Comma-separated page counts of generated PDFs.")
+    parser.add_argument("--pdf-repeats", type=int, default=5)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (faster on big corpora).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the report to this JSON file.")
+    parser.add_argument("--baseline", help="Earlier --json report to compare against (ratio > 1 means bigger now).")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.queries, args.pdf_pages, args.pdf_repeats, args.seed, not args.no_memory)
+    print_report(report)
+
+    if args.baseline:
+        with open(os.path.join(START_DIR, args.baseline)) as f:
+            baseline = json.load(f)
+        print(f"\n{'metric':<60}{'baseline':>12}{'current':>12}{'ratio':>8}")
+        for metric, before, after, ratio in compare(report, baseline):
+            print(f"{metric:<60}{before:>12.4f}{after:>12.4f}{ratio:>8.2f}")
+
+    if args.json:
+        with open(os.path.join(START_DIR, args.json), "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import contextlib
+from collections import defaultdict
+
+# Paths given on the command line are relative to where the script was started
+START_DIR = os.getcwd()
+
+# Run inside a scratch directory so uploads and the database don't touch real data
+os.chdir(tempfile.mkdtemp(prefix="studycopilot-load-"))
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from stubs import ScriptedModel, import_app, percentile
+
+agent_app = import_app()
+from fake_calendar import FakeCalendar
+
+
+# Share of requests per route in the replayed traffic
+TRAFFIC_MIX = {
+    "POST /chat": 40,
+    "GET /dashboard_stats": 25,
+    "POST /generate_quiz": 15,
+    "POST /evaluate_interview": 10,
+    "POST /upload": 10,
+}
+
+CHAT_MESSAGES = [
+    "Can you explain photosynthesis in simple terms?",
+    "Help me plan my revision for the algorithms exam",
+    "What did my notes say about recursion?",
+    "Quiz me on thermodynamics",
+    "Reschedule my physics session",
+]
+
+QUIZ_REPLY = """```json
+{"questions": [
+  {"question": "What does chlorophyll absorb?", "options": ["Light", "Water", "Oxygen", "Salt"], "correct": 0},
+  {"question": "Where does respiration happen?", "options": ["Nucleus", "Mitochondria", "Wall", "Vacuole"], "correct": 1}
+]}
+```"""
+
+EVALUATION_REPLY = """```json
+{"overall_feedback": "Solid answers with room for more detail.",
+ "evaluations": [{"question_index": 0, "rating": 7, "feedback": "Good structure."}]}
+```"""
+
+
+def model_reply(prompt) -> str:
+    """Gemini stand-in answers shaped like each endpoint expects."""
+    text = str(prompt)
+    if "multiple-choice questions" in text:
+        return QUIZ_REPLY
+    if "Evaluate the following candidate" in text:
+        return EVALUATION_REPLY
+    return "Here is a short explanation. Keep practising a little every day!"
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class Server:
+    """
+    agent_app on a real threaded werkzeug server (like `python agent_app.py`),
+    so requests pay for HTTP parsing, cookies and thread-per-request handling.
+    """
+
+    def __init__(self):
+        self.server = make_server("127.0.0.1", 0, agent_app.app, threaded=True, request_handler=QuietHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.thread.join()
+
+
+class SimulatedUser:
+    """
+    One logged-in student with their own cookie session, calendar and upload.
+    """
+
+    def __init__(self, base_url: str, user_id: str, fake: FakeCalendar, rng: random.Random):
+        self.base_url = base_url
+        self.user_id = user_id
+        self.rng = rng
+        self.http = requests.Session()
+        self.token = f"token-{user_id}"
+        fake.seed_events(self.token, [])
+        self.http.post(f"{base_url}/auth/login", json={
+            "uid": user_id, "name": user_id, "email": f"{user_id}@example.com", "access_token": self.token,
+        }).raise_for_status()
+        self.filename = f"notes-{user_id}.txt"
+        self.upload()
+
+    def upload(self):
+        body = "\n\n".join(
+            f"Chapter {i}: photosynthesis chlorophyll respiration mitochondria enzymes " * 5 for i in range(20)
+        )
+        return self.http.post(f"{self.base_url}/upload", files={"file": (self.filename, body.encode(), "text/plain")})
+
+    def request(self, route: str):
+        if route == "POST /chat":
+            return self.http.post(f"{self.base_url}/chat", json={"message": self.rng.choice(CHAT_MESSAGES)})
+        if route == "GET /dashboard_stats":
+            return self.http.get(f"{self.base_url}/dashboard_stats")
+        if route == "POST /generate_quiz":
+            return self.http.post(f"{self.base_url}/generate_quiz", json={"mode": "upload", "filename": self.filename})
+        if route == "POST /evaluate_interview":
+            return self.http.post(f"{self.base_url}/evaluate_interview", json={
+                "job_role": "Data Analyst",
+                "qa_pairs": [{"question": "Tell me about a project.", "answer": "I built a dashboard."}] * 3,
+            })
+        if route == "POST /upload":
+            return self.upload()
+        raise ValueError(route)
+
+
+def run_level(server: Server, fake: FakeCalendar, users: int, seconds: float, think_ms: float, seed: int) -> dict:
+    routes, weights = zip(*TRAFFIC_MIX.items())
+    timings = defaultdict(list)  # route -> [ms]
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = [None]
+    # Logins and first uploads happen before the clock starts
+    ready = threading.Barrier(users + 1, action=lambda: deadline.__setitem__(0, time.perf_counter() + seconds))
+
+    def worker(n):
+        rng = random.Random(seed * 1000 + n)
+        user = SimulatedUser(server.url, f"load-{users}-{n}", fake, rng)
+        ready.wait()
+        while time.perf_counter() < deadline[0]:
+            route = rng.choices(routes, weights)[0]
+            started = time.perf_counter()
+            try:
+                ok = user.request(route).status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                timings[route].append(elapsed)
+                if not ok:
+                    errors[route] += 1
+            if think_ms:
+                time.sleep(rng.expovariate(1 / think_ms) / 1000)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(users)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    per_route = {}
+    for route in routes:
+        samples = timings.get(route)
+        if not samples:
+            continue
+        per_route[route] = {
+            "requests": len(samples),
+            "errors": errors[route],
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "max_ms": round(max(samples), 2),
+        }
+    total = sum(len(s) for s in timings.values())
+    everything = [ms for samples in timings.values() for ms in samples]
+    return {
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "rps": round(total / elapsed, 2),
+        "p50_ms": round(percentile(everything, 50), 2) if everything else None,
+        "p99_ms": round(percentile(everything, 99), 2) if everything else None,
+        "routes": per_route,
+    }
+
+
+def saturation_point(levels: list[dict], min_gain: float = 1.1) -> int | None:
+    """First concurrency level after which adding users raised throughput by less than `min_gain`x."""
+    for previous, current in zip(levels, levels[1:]):
+        if current["rps"] < previous["rps"] * min_gain:
+            return previous["users"]
+    return None
+
+
+def run(levels: list[int], seconds: float, think_ms: float, llm_ms: float, calendar_ms: float, seed: int) -> dict:
+    agent_app.model = ScriptedModel(model_reply, latency=llm_ms / 1000)
+    fake = FakeCalendar(latency=calendar_ms / 1000, seed=seed)
+
+    results = []
+    with fake.installed(), Server() as server:
+        for users in levels:
+            # The app logs to stdout on every request; keep the report readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = run_level(server, fake, users, seconds, think_ms, seed)
+            results.append(result)
+            print(f"  {users:>4} users: {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+                  f"p99 {result['p99_ms']:>8.1f} ms  errors {result['errors']}", file=sys.stderr)
+
+    return {
+        "config": {
+            "levels": levels,
+            "seconds_per_level": seconds,
+            "think_ms": think_ms,
+            "llm_latency_ms": llm_ms,
+            "calendar_latency_ms": calendar_ms,
+            "traffic_mix": TRAFFIC_MIX,
+        },
+        "levels": results,
+        "saturates_at_users": saturation_point(results),
+    }
+
+
+def print_report(report: dict):
+    print(f"Load test: {report['config']}")
+    print(f"{'users':>6}  {'route':<26}{'req':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for level in report["levels"]:
+        for route, r in level["routes"].items():
+            print(f"{level['users']:>6}  {route:<26}{r['requests']:>7}{r['rps']:>9.1f}"
+                  f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>8}")
+        print(f"{level['users']:>6}  {'all':<26}{level['requests']:>7}{level['rps']:>9.1f}"
+              f"{level['p50_ms']:>9.1f}{'':>9}{level['p99_ms']:>9.1f}{level['errors']:>8}")
+    if report["saturates_at_users"]:
+        print(f"Throughput stops scaling after {report['saturates_at_users']} concurrent users.")
+    else:
+        print("Throughput still scaling at the highest level tested.")
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test: replay chat/quiz/interview/dashboard/upload traffic at rising concurrency.")
+    parser.add_argument("--levels", type=int_list, default=[1, 2, 4, 8, 16, 32], help="Comma-separated concurrent user counts.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each concurrency level.")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between a user's requests.")
+    parser.add_argument("--llm-ms", type=float, default=800.0, help="Simulated Gemini latency per call.")
+    parser.add_argument("--calendar-ms", type=float, default=80.0, help="Simulated Calendar API latency per round trip.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the report to this JSON file.")
+    args = parser.parse_args()
+
+    report = run(args.levels, args.seconds, args.think_ms, args.llm_ms, args.calendar_ms, args.seed)
+    print_report(report)
+    if args.json:
+        with open(os.path.join(START_DIR, args.json), "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,128 @@
+import os
+import io
+import random
+import argparse
+import tempfile
+import threading
+import traceback
+import contextlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Run inside a scratch directory so uploads and the database don't touch real data
+os.chdir(tempfile.mkdtemp(prefix="studycopilot-stress-"))
+
+from stubs import ScriptedModel, import_app
+
+agent_app = import_app()
+import storage
+
+
+WORDS = ["python", "recursion", "dynamic", "programming", "graphs", "sorting", "matrices", "calculus"]
+
+
+def make_text(rng: random.Random, paragraphs: int = 20) -> str:
+    return "\n\n".join(" ".join(rng.choice(WORDS) for _ in range(40)) for _ in range(paragraphs))
+
+
+def run(threads: int, ops: int, users: int, chats: int, seed: int) -> dict:
+    agent_app.model = ScriptedModel("Keep going!", latency=0.001)
+    rng = random.Random(seed)
+    errors = []
+    sent = Counter()  # (kind, key) -> count
+    sent_lock = threading.Lock()
+
+    # A few shared chat sessions per user, hammered from many threads at once
+    session_ids = {
+        f"user-{u}": [agent_app.sessions.create(f"user-{u}") for _ in range(chats)]
+        for u in range(users)
+    }
+
+    def record(kind, key):
+        with sent_lock:
+            sent[(kind, key)] += 1
+
+    def client_for(user_id):
+        client = agent_app.app.test_client()
+        with client.session_transaction() as s:
+            s["user_id"] = user_id
+            s["user_name"] = user_id
+        return client
+
+    def worker(n):
+        local = random.Random(seed + n)
+        user_id = f"user-{local.randrange(users)}"
+        client = client_for(user_id)
+        for i in range(ops):
+            op = local.choice(["ingest", "retrieve", "retrieve", "chat", "chat", "quiz", "task"])
+            try:
+                if op == "ingest":
+                    name = f"doc-{local.randrange(50)}.txt"
+                    if local.random() < 0.2:
+                        agent_app.rag_system.remove_document(name)
+                    else:
+                        agent_app.rag_system.add_document(name, make_text(local, 5))
+                elif op == "retrieve":
+                    agent_app.rag_system.retrieve_context("explain dynamic programming and recursion")
+                elif op == "chat":
+                    sid = local.choice(session_ids[user_id])
+                    r = client.post("/chat", json={"message": f"question {n}-{i} about graphs", "session_id": sid})
+                    assert r.status_code == 200, r.status_code
+                    record("chat", sid)
+                elif op == "quiz":
+                    r = client.post("/submit_quiz_result", json={"topic": local.choice(WORDS), "score": 3, "total": 5})
+                    assert r.status_code == 200, r.status_code
+                    record("quiz", user_id)
+                else:
+                    task = client.post("/manual_tasks", json={"text": f"task {n}-{i}"}).get_json()
+                    r = client.put(f"/manual_tasks/{task['id']}/toggle")
+                    assert r.status_code == 200, r.status_code
+                    record("task", user_id)
+            except Exception:
+                errors.append(traceback.format_exc())
+
+    # Seed the index so readers have something to scan from the start
+    for i in range(50):
+        agent_app.rag_system.add_document(f"doc-{i}.txt", make_text(rng))
+
+    # redirect_stdout swaps a global, so do it once around the whole run
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+
+    # Invariants: nothing lost, turns never interleaved
+    problems = []
+    for user_id, sids in session_ids.items():
+        for sid in sids:
+            history = agent_app.sessions.get(sid)["history"]
+            if len(history) != 2 * sent[("chat", sid)]:
+                problems.append(f"{sid}: {len(history)} turns for {sent[('chat', sid)]} chats")
+            roles = [t["role"] for t in history]
+            if roles != ["user", "model"] * (len(roles) // 2):
+                problems.append(f"{sid}: turns interleaved")
+        quizzes = len(storage.quiz_results_for_user(user_id))
+        if quizzes != sent[("quiz", user_id)]:
+            problems.append(f"{user_id}: {quizzes} quiz results, expected {sent[('quiz', user_id)]}")
+        attempts = sum(t["attempts"] for t in storage.knowledge_profile(user_id))
+        if attempts != quizzes:
+            problems.append(f"{user_id}: topic aggregates count {attempts}, expected {quizzes}")
+        tasks = storage.tasks_for_user(user_id)
+        if len(tasks) != sent[("task", user_id)] or not all(t["completed"] for t in tasks):
+            problems.append(f"{user_id}: {len(tasks)} tasks, expected {sent[('task', user_id)]}")
+
+    return {"errors": errors, "problems": problems, "operations": sum(sent.values())}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hammer shared state (RAG index, sessions, quiz history, tasks) from many threads.")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200, help="Operations per thread.")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--chats", type=int, default=2, help="Chat sessions per user.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    result = run(args.threads, args.ops, args.users, args.chats, args.seed)
+    print(f"{result['operations']} recorded writes, {len(result['errors'])} errors, {len(result['problems'])} invariant violations")
+    for line in result["errors"][:5] + result["problems"][:20]:
+        print(line)
+    raise SystemExit(1 if result["errors"] or result["problems"] else 0)
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import asyncio
+
+# Benchmarks run against the repo checkout without a Google account or Gemini key
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("RECALL_DIGEST_JOB", "0")
+
+
+def import_app():
+    """
+    Import agent_app and wait for its background RAG warmup, so runs start
+    from a fully indexed state. Startup logs go to stderr (LOG_LEVEL).
+    """
+    import agent_app
+    agent_app.rag_ready.wait()
+    return agent_app
+
+
+class _Obj:
+    pass
+
+
+def fake_response(text: str):
+    """
+    Object shaped like a google.generativeai response (.text and .candidates).
+    """
+    part = _Obj()
+    part.text = text
+    response = _Obj()
+    response.text = text
+    response.candidates = [_Obj()]
+    response.candidates[0].content = _Obj()
+    response.candidates[0].content.parts = [part]
+    return response
+
+
+class ScriptedModel:
+    """
+    Gemini stand-in: returns `reply` (a string, or a callable taking the prompt)
+    after an optional simulated delay.
+    """
+
+    def __init__(self, reply="OK", latency: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, *args, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = kwargs.get("contents", args[0] if args else None)
+        text = self.reply(prompt) if callable(self.reply) else self.reply
+        return fake_response(text)
+
+    async def generate_content_async(self, *args, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        prompt = kwargs.get("contents", args[0] if args else None)
+        text = self.reply(prompt) if callable(self.reply) else self.reply
+        return fake_response(text)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
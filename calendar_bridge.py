@@ -4,10 +4,9 @@ import traceback
 
 from flask import Flask, request, jsonify
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+# The Google client libraries are imported inside the functions that use them:
+# googleapiclient alone takes several hundred ms to import and most requests
+# never touch the Calendar API.
 
 
 # ========= CONFIG =========
@@ -33,6 +32,10 @@ def get_credentials():
     Load / refresh OAuth credentials, or run browser OAuth flow if first time.
     This will create/refresh token.json on disk.
     """
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
     creds = None
 
     # Load existing token if it exists
@@ -66,6 +69,9 @@ def build_calendar_service(access_token: str = None):
     if not access_token:
         raise ValueError("access_token is required for calendar operations")
         
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
     creds = Credentials(token=access_token)
     service = build("calendar", "v3", credentials=creds)
     return service
@@ -130,6 +136,27 @@ def list_events(time_min_iso: str, time_max_iso: str, max_results: int = 10, acc
     }
 
 
+def freebusy(time_min_iso: str, time_max_iso: str, access_token: str = None) -> dict:
+    """
+    Fetch busy blocks of the primary calendar in one free/busy query.
+    """
+    service = build_calendar_service(access_token)
+
+    result = service.freebusy().query(body={
+        "timeMin": time_min_iso,
+        "timeMax": time_max_iso,
+        "timeZone": DEFAULT_TZ,
+        "items": [{"id": "primary"}],
+    }).execute()
+
+    busy = result.get("calendars", {}).get("primary", {}).get("busy", [])
+
+    return {
+        "ok": True,
+        "busy": busy
+    }
+
+
 def update_event(event_id: str, summary: str = None, description: str = None, start_iso: str = None, end_iso: str = None, access_token: str = None) -> dict:
     """
     Update an existing event.
@@ -0,0 +1,143 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+try:
+    import brotli  # optional: `pip install brotli` adds .br variants of static assets
+except ImportError:
+    brotli = None
+
+
+# ========= CONFIG =========
+
+# Static files that get fingerprinted URLs, and which of them are worth compressing
+ASSET_EXTENSIONS = {".css", ".js", ".svg", ".png", ".jpg", ".jpeg", ".ico", ".woff2"}
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg"}
+
+# Fingerprinted URLs never change content, so browsers may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# JSON responses smaller than this are sent as-is (gzip can't win much on tiny bodies)
+JSON_COMPRESS_MIN_BYTES = 1400
+JSON_GZIP_LEVEL = 6
+
+# ==========================
+
+
+def _variants(data: bytes) -> dict:
+    """Precompressed bodies keyed by Content-Encoding, only where they are smaller."""
+    variants = {}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        variants["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            variants["br"] = br
+    return variants
+
+
+def pick_encoding(accept_encodings, available) -> str | None:
+    """Best encoding the client accepts: br, then gzip, else None (identity)."""
+    for encoding in ("br", "gzip"):
+        if encoding in available and accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+class StaticAssets:
+    """
+    Content-hash fingerprinted URLs for the files in the static folder.
+
+    `url("style.css")` gives "/assets/style.<hash>.css"; that URL is served
+    from memory with immutable cache headers and gzip/brotli variants built
+    once, so browsers never revalidate it and a changed file gets a new URL.
+    The table is built on first use (or by calling `load()` at startup); with
+    `reload=True` (debug mode) edited files are picked up on the next call.
+    """
+
+    def __init__(self, static_dir: str, url_prefix: str = "/assets"):
+        self.static_dir = static_dir
+        self.url_prefix = url_prefix
+        self.by_name = {}  # "style.css" -> asset dict
+        self.by_fingerprint = {}  # "style.<hash>.css" -> asset dict
+        self.mtimes = None
+        self.lock = threading.Lock()
+
+    def _scan_mtimes(self) -> dict:
+        mtimes = {}
+        if os.path.isdir(self.static_dir):
+            for root, dirs, files in os.walk(self.static_dir):
+                for filename in files:
+                    if os.path.splitext(filename)[1].lower() in ASSET_EXTENSIONS:
+                        path = os.path.join(root, filename)
+                        mtimes[path] = os.stat(path).st_mtime
+        return mtimes
+
+    def load(self):
+        with self.lock:
+            mtimes = self._scan_mtimes()
+            by_name = {}
+            for path in mtimes:
+                name = os.path.relpath(path, self.static_dir).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                stem, ext = os.path.splitext(name)
+                by_name[name] = {
+                    "fingerprint": f"{stem}.{digest}{ext}",
+                    "etag": digest,
+                    "mimetype": mimetypes.guess_type(name)[0] or "application/octet-stream",
+                    "body": data,
+                    "variants": _variants(data) if ext.lower() in COMPRESSIBLE_EXTENSIONS else {},
+                }
+            self.by_name = by_name
+            self.by_fingerprint = {a["fingerprint"]: a for a in by_name.values()}
+            self.mtimes = mtimes
+
+    def _ensure(self, reload: bool):
+        if self.mtimes is None or (reload and self._scan_mtimes() != self.mtimes):
+            self.load()
+
+    def url(self, name: str, reload: bool = False) -> str:
+        """Fingerprinted URL for a static file, or the plain /static URL if unknown."""
+        self._ensure(reload)
+        asset = self.by_name.get(name)
+        if asset is None:
+            return f"/static/{name}"
+        return f"{self.url_prefix}/{asset['fingerprint']}"
+
+    def get(self, fingerprint: str, reload: bool = False) -> dict | None:
+        self._ensure(reload)
+        return self.by_fingerprint.get(fingerprint)
+
+
+def compress_json_response(response, accept_encodings):
+    """
+    gzip a JSON response in place when it is large enough and the client
+    accepts it. Streams, 304s and already-encoded bodies are left alone.
+    """
+    if (response.status_code != 200
+            or response.mimetype != "application/json"
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers):
+        return response
+
+    body = response.get_data()
+    if len(body) < JSON_COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add("Accept-Encoding")
+    if pick_encoding(accept_encodings, ("gzip",)) is None:
+        return response
+
+    response.set_data(gzip.compress(body, compresslevel=JSON_GZIP_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    # The compressed bytes differ from the identity body the ETag was made
+    # from, so the validator is only weakly equal from here on
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,85 @@
+import threading
+import contextlib
+
+
+class CopyOnWriteMap:
+    """
+    Dict for read-mostly shared state (e.g. the RAG index).
+
+    Readers work on an immutable snapshot and never take a lock; writers are
+    serialized, copy the current dict, change the copy and swap it in with a
+    single reference assignment. A reader that is iterating keeps its old
+    snapshot, so "dict changed size during iteration" can't happen.
+    """
+
+    def __init__(self, initial=None):
+        self._data = dict(initial or {})
+        self._write_lock = threading.Lock()
+
+    def snapshot(self) -> dict:
+        """The current contents. Must be treated as read-only."""
+        return self._data
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, items: dict):
+        with self._write_lock:
+            data = dict(self._data)
+            data.update(items)
+            self._data = data
+
+    def pop(self, key, default=None):
+        with self._write_lock:
+            if key not in self._data:
+                return default
+            data = dict(self._data)
+            value = data.pop(key)
+            self._data = data
+            return value
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def items(self):
+        return self._data.items()
+
+
+class KeyedLocks:
+    """
+    One lock per key, created on demand and dropped when nobody holds or waits
+    for it (e.g. one lock per chat session).
+
+        with session_locks.hold(session_id):
+            ...
+    """
+
+    def __init__(self):
+        self._locks = {}  # key -> [lock, holders + waiters]
+        self._guard = threading.Lock()
+
+    @contextlib.contextmanager
+    def hold(self, key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
@@ -0,0 +1,233 @@
+import json
+import datetime as dt
+import time
+import uuid
+import random
+import threading
+import contextlib
+from collections import Counter
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import calendar_bridge
+from availability import parse_iso
+
+
+def _http_error(status: int, reason: str) -> HttpError:
+    body = json.dumps({"error": {"code": status, "message": reason, "errors": [{"reason": reason}]}})
+    return HttpError(httplib2.Response({"status": status}), body.encode("utf-8"))
+
+
+def _when(event: dict, field: str):
+    value = event.get(field, {}).get("dateTime") or event.get(field, {}).get("date")
+    if not value:
+        return None
+    when = parse_iso(value)
+    return when if when.tzinfo else when.replace(tzinfo=dt.timezone.utc)
+
+
+class _Request:
+    """
+    Mimics googleapiclient's HttpRequest: nothing happens until execute().
+    """
+
+    def __init__(self, fake, op: str, fn):
+        self.fake = fake
+        self.op = op
+        self.fn = fn
+
+    def execute(self):
+        self.fake._round_trip(self.op)
+        return self.fn()
+
+
+class _BatchRequest:
+    """
+    Mimics BatchHttpRequest: sub-requests are sent in a single round trip.
+    """
+
+    def __init__(self, fake, callback=None):
+        self.fake = fake
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self.requests.append((request_id or str(len(self.requests)), request, callback or self.callback))
+
+    def execute(self):
+        self.fake._round_trip("batch")
+        for request_id, request, callback in self.requests:
+            with self.fake.lock:
+                self.fake.calls[request.op] += 1
+            try:
+                response, exception = request.fn(), None
+            except HttpError as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class _Events:
+    def __init__(self, fake, token):
+        self.fake = fake
+        self.token = token
+
+    def insert(self, calendarId="primary", body=None, **kwargs):
+        def run():
+            event = dict(body or {})
+            event["id"] = uuid.uuid4().hex
+            event["htmlLink"] = f"https://calendar.google.com/event?eid={event['id']}"
+            event["status"] = "confirmed"
+            with self.fake.lock:
+                self.fake._store(self.token)[event["id"]] = event
+            return dict(event)
+        return _Request(self.fake, "insert", run)
+
+    def list(self, calendarId="primary", timeMin=None, timeMax=None, maxResults=250, **kwargs):
+        def run():
+            with self.fake.lock:
+                events = list(self.fake._store(self.token).values())
+            lo = parse_iso(timeMin) if timeMin else None
+            hi = parse_iso(timeMax) if timeMax else None
+            items = [
+                dict(e) for e in events
+                if _when(e, "start") and (not hi or _when(e, "start") < hi)
+                and (not lo or _when(e, "end") > lo)
+            ]
+            items.sort(key=lambda e: _when(e, "start"))
+            return {"kind": "calendar#events", "items": items[:maxResults]}
+        return _Request(self.fake, "list", run)
+
+    def get(self, calendarId="primary", eventId=None, **kwargs):
+        def run():
+            with self.fake.lock:
+                event = self.fake._store(self.token).get(eventId)
+            if event is None:
+                raise _http_error(404, "notFound")
+            return dict(event)
+        return _Request(self.fake, "get", run)
+
+    def update(self, calendarId="primary", eventId=None, body=None, **kwargs):
+        def run():
+            with self.fake.lock:
+                store = self.fake._store(self.token)
+                if eventId not in store:
+                    raise _http_error(404, "notFound")
+                event = dict(body or {})
+                event["id"] = eventId
+                store[eventId] = event
+            return dict(event)
+        return _Request(self.fake, "update", run)
+
+    def delete(self, calendarId="primary", eventId=None, **kwargs):
+        def run():
+            with self.fake.lock:
+                if self.fake._store(self.token).pop(eventId, None) is None:
+                    raise _http_error(410, "deleted")
+            return ""
+        return _Request(self.fake, "delete", run)
+
+
+class _FreeBusy:
+    def __init__(self, fake, token):
+        self.fake = fake
+        self.token = token
+
+    def query(self, body=None, **kwargs):
+        def run():
+            body_ = body or {}
+            listing = _Events(self.fake, self.token).list(
+                timeMin=body_.get("timeMin"), timeMax=body_.get("timeMax")
+            ).fn()
+            # All-day events only have a "date"; free/busy reports them as timestamps too
+            busy = [{"start": _when(e, "start").isoformat(), "end": _when(e, "end").isoformat()}
+                    for e in listing["items"] if _when(e, "end")]
+            return {"calendars": {"primary": {"busy": busy}}}
+        return _Request(self.fake, "freebusy", run)
+
+
+class _Service:
+    def __init__(self, fake, token):
+        self.fake = fake
+        self.token = token
+
+    def events(self):
+        return _Events(self.fake, self.token)
+
+    def freebusy(self):
+        return _FreeBusy(self.fake, self.token)
+
+    def new_batch_http_request(self, callback=None):
+        return _BatchRequest(self.fake, callback)
+
+
+class FakeCalendar:
+    """
+    In-process stand-in for the Calendar v3 API used by calendar_bridge.
+    Events are kept per access token, so each token behaves like a separate
+    user's primary calendar. Every API operation is counted in `calls`.
+
+        fake = FakeCalendar(latency=0.05, error_rate=0.01)
+        with fake.installed():
+            calendar_bridge.list_events(...)   # served by the fake
+
+    latency:    seconds added to every round trip (float, or a callable returning one)
+    error_rate: probability that a round trip fails with HTTP 503
+    """
+
+    def __init__(self, latency=0.0, error_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calendars = {}  # access_token -> {event_id: event}
+        self.calls = Counter()  # op -> number of API operations
+        self.round_trips = 0
+        self.lock = threading.Lock()
+
+    def service(self, access_token: str = None) -> _Service:
+        if not access_token:
+            raise ValueError("access_token is required for calendar operations")
+        return _Service(self, access_token)
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls.clear()
+            self.round_trips = 0
+
+    def seed_events(self, access_token: str, events: list[dict]):
+        """
+        Put events straight into a calendar without counting API calls.
+        """
+        with self.lock:
+            store = self._store(access_token)
+            for event in events:
+                event = dict(event)
+                event.setdefault("id", uuid.uuid4().hex)
+                store[event["id"]] = event
+
+    @contextlib.contextmanager
+    def installed(self):
+        """
+        Route calendar_bridge through this fake for the duration of the block.
+        """
+        original = calendar_bridge.build_calendar_service
+        calendar_bridge.build_calendar_service = self.service
+        try:
+            yield self
+        finally:
+            calendar_bridge.build_calendar_service = original
+
+    def _store(self, token: str) -> dict:
+        return self.calendars.setdefault(token, {})
+
+    def _round_trip(self, op: str):
+        with self.lock:
+            self.calls[op] += 1
+            self.round_trips += 1
+            fail = self.error_rate and self.random.random() < self.error_rate
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise _http_error(503, "backendError")
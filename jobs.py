@@ -0,0 +1,79 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+import applog
+
+
+# ========= CONFIG =========
+
+# Worker threads per process for background jobs (separate from request threads)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+
+# Jobs allowed to wait for a worker; beyond this, submissions are refused
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "50"))
+
+# How long a job and its result can be fetched (after it finishes, or after
+# submission if its process dies before it runs)
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL", "600"))
+
+# ==========================
+
+log = applog.get_logger("jobs")
+
+
+class QueueFull(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+
+class JobRunner:
+    """
+    Runs slow work (Gemini calls) on a fixed pool of worker threads.
+
+    `submit` returns a job id right away; status and result live in the shared
+    database for JOB_RESULT_TTL_SECONDS, so any worker process can answer a
+    poll. `fn` returns (status code, JSON-able body) like the endpoint it
+    stands in for. `on_finish(user_id, job)` is called when a job is done.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_limit: int = JOB_QUEUE_LIMIT,
+                 ttl: float = JOB_RESULT_TTL_SECONDS, on_finish=None):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.slots = threading.BoundedSemaphore(workers + queue_limit)
+        self.ttl = ttl
+        self.on_finish = on_finish
+
+    def submit(self, user_id: str, kind: str, fn) -> str:
+        if not self.slots.acquire(blocking=False):
+            raise QueueFull()
+        try:
+            storage.prune_jobs()
+            job_id = uuid.uuid4().hex
+            storage.create_job(job_id, user_id, kind, time.time() + self.ttl)
+            self.pool.submit(self._run, job_id, user_id, kind, fn)
+        except Exception:
+            self.slots.release()
+            raise
+        log.debug("job.queued", job_id=job_id, kind=kind, user_id=user_id)
+        return job_id
+
+    def _run(self, job_id: str, user_id: str, kind: str, fn):
+        started = time.perf_counter()
+        try:
+            storage.start_job(job_id)
+            status_code, result = fn()
+        except Exception as e:
+            log.error("job.failed", exc_info=True, job_id=job_id, kind=kind)
+            status_code, result = 500, {"error": str(e)}
+        finally:
+            self.slots.release()
+
+        status = "done" if status_code < 400 else "failed"
+        storage.finish_job(job_id, status, status_code, result, time.time() + self.ttl)
+        log.info("job.finished", job_id=job_id, kind=kind, status=status,
+                 ms=round((time.perf_counter() - started) * 1000, 1))
+        if self.on_finish:
+            self.on_finish(user_id, {"job_id": job_id, "kind": kind, "status": status})
@@ -0,0 +1,130 @@
+import os
+import time
+import asyncio
+import functools
+import contextlib
+
+import storage
+
+
+# ========= CONFIG =========
+
+# Prompt + output tokens one user may spend per UTC day (0 = no limit)
+DAILY_TOKEN_BUDGET = int(os.getenv("LLM_DAILY_TOKEN_BUDGET", "0"))
+
+# Rough characters per token, used when a response carries no usage metadata
+CHARS_PER_TOKEN = 4
+
+# ==========================
+
+
+class BudgetExceeded(Exception):
+    """The user has used up today's LLM token budget."""
+
+    def __init__(self, user_id: str, used: int, budget: int):
+        super().__init__(f"Daily AI usage limit reached ({used}/{budget} tokens). Try again tomorrow.")
+        self.user_id = user_id
+        self.used = used
+        self.budget = budget
+
+
+def today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def _estimate(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def token_counts(request_payload, response) -> tuple[int, int, int]:
+    """
+    (prompt, output, cached) tokens from the response's usage metadata, or an
+    estimate from the text lengths when there is none (e.g. stubbed models).
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and getattr(usage, "total_token_count", 0):
+        return (
+            getattr(usage, "prompt_token_count", 0) or 0,
+            getattr(usage, "candidates_token_count", 0) or 0,
+            getattr(usage, "cached_content_token_count", 0) or 0,
+        )
+    try:
+        output = response.text or ""
+    except Exception:
+        output = ""
+    return _estimate(str(request_payload)), _estimate(output), 0
+
+
+def check_budget(user_id: str | None):
+    if not DAILY_TOKEN_BUDGET or not user_id:
+        return
+    used = storage.llm_tokens_for_day(user_id, today())
+    if used >= DAILY_TOKEN_BUDGET:
+        raise BudgetExceeded(user_id, used, DAILY_TOKEN_BUDGET)
+
+
+def remaining_budget(user_id: str) -> int | None:
+    if not DAILY_TOKEN_BUDGET:
+        return None
+    return max(0, DAILY_TOKEN_BUDGET - storage.llm_tokens_for_day(user_id, today()))
+
+
+@contextlib.contextmanager
+def track(user_id: str | None, route: str, prompt_type: str, request_payload):
+    """
+    Account one LLM call: checks the budget first, then records tokens and
+    latency (errors too). The block sets `call["response"]`.
+
+        with llm_usage.track(user_id, route, "chat", contents) as call:
+            call["response"] = model.generate_content(contents)
+    """
+    check_budget(user_id)
+    call = {"response": None}
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        _record(user_id, route, prompt_type, request_payload, None, started)
+        raise
+    _record(user_id, route, prompt_type, request_payload, call["response"], started)
+
+
+@contextlib.asynccontextmanager
+async def track_async(user_id: str | None, route: str, prompt_type: str, request_payload, executor=None):
+    """
+    `track` for coroutines (ASGI mode): the budget check and the usage write
+    are SQLite calls, so they run on `executor` and never block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, check_budget, user_id)
+    call = {"response": None}
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        await loop.run_in_executor(
+            executor, functools.partial(_record, user_id, route, prompt_type, request_payload, None, started)
+        )
+        raise
+    await loop.run_in_executor(
+        executor, functools.partial(_record, user_id, route, prompt_type, request_payload, call["response"], started)
+    )
+
+
+def _record(user_id, route, prompt_type, request_payload, response, started):
+    """Store one call's tokens and latency; no response means it failed"""
+    latency_ms = (time.perf_counter() - started) * 1000
+    if response is None:
+        storage.add_llm_usage(today(), user_id or "-", route, prompt_type, errors=1, latency_ms=latency_ms)
+        return
+    prompt_tokens, output_tokens, cached_tokens = token_counts(request_payload, response)
+    storage.add_llm_usage(
+        today(), user_id or "-", route, prompt_type,
+        prompt_tokens=prompt_tokens, output_tokens=output_tokens, cached_tokens=cached_tokens,
+        latency_ms=latency_ms
+    )
+
+
+def record_cache_hit(user_id: str | None, route: str, prompt_type: str):
+    """A response served from a stored result instead of a new LLM call."""
+    storage.add_llm_usage(today(), user_id or "-", route, prompt_type, calls=0, cache_hits=1)
@@ -0,0 +1,110 @@
+import time
+import bisect
+import threading
+import contextlib
+
+from flask import has_request_context, request
+
+
+# ========= CONFIG =========
+
+# Histogram bucket upper bounds in seconds (Gemini calls take seconds, lookups take ms)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ==========================
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_float(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    """
+    Minimal Prometheus-style histogram with labels (per process).
+
+        h = Histogram("x_seconds", "What x measures", ("route", "stage"))
+        h.observe(0.12, "/chat", "gemini")
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> {"counts": [...], "sum": float, "count": int}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labelvalues)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self.series[labelvalues] = series
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            snapshot = [(labels, dict(s, counts=list(s["counts"]))) for labels, s in sorted(self.series.items())]
+        for labelvalues, series in snapshot:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{_format_float(bound)}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {_format_float(series['sum'])}")
+            lines.append(f"{self.name}_count{{{labels}}} {series['count']}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "studycopilot_request_duration_seconds",
+    "Time to build a response, by route, method and status.",
+    ("route", "method", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "studycopilot_stage_duration_seconds",
+    "Time spent in one stage of handling a request (chat stages, Calendar and Gemini calls).",
+    ("route", "stage"),
+)
+
+REGISTRY = [REQUEST_SECONDS, STAGE_SECONDS]
+
+
+def current_route() -> str:
+    """URL rule of the request being handled ("/history/<session_id>"), or "background"."""
+    if not has_request_context():
+        return "background"
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+@contextlib.contextmanager
+def span(stage: str, route: str = None):
+    """Time a block as `stage` of the current route, even if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, route or current_route(), stage)
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import threading
+
+import storage
+
+
+# ========= CONFIG =========
+
+# Change types pushed to the browser, and the cached data each one makes stale
+CHANGE_KINDS = {
+    "event_created": "events",
+    "event_updated": "events",
+    "event_deleted": "events",
+    "upload_indexed": "uploads",
+    "upload_deleted": "uploads",
+    "quiz_submitted": "quiz",
+    "sessions_changed": "sessions",
+}
+
+# Listeners re-check the database this often, to see changes made by other workers
+POLL_SECONDS = 2
+
+# Comment line sent on idle streams so proxies don't close them
+HEARTBEAT_SECONDS = 15
+
+# Notifications older than this are pruned; reconnecting clients only need recent ones
+RETENTION_SECONDS = 3600
+
+# Under the threaded WSGI server every open stream holds a worker thread, so
+# streams are capped per process and closed after a while (EventSource
+# reconnects on its own, resuming from Last-Event-ID). ASGI mode has no cap.
+WSGI_MAX_STREAMS = int(os.getenv("SSE_WSGI_MAX_STREAMS", "8"))
+WSGI_STREAM_SECONDS = int(os.getenv("SSE_WSGI_STREAM_SECONDS", "300"))
+
+# Reconnect delay suggested to clients turned away by the cap
+BUSY_RETRY_MS = 30000
+
+# ==========================
+
+
+class _Channel:
+    """One user's open streams in this process."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.sequence = 0
+        self.listeners = 0
+
+
+class ChangeBus:
+    """
+    Per-user change notifications for Server-Sent Events.
+
+    `publish` stores the notification in the shared database and wakes that
+    user's local listeners at once (other users' streams stay asleep);
+    listeners in other worker processes pick it up on their next poll.
+    Notification ids double as SSE event ids, so a reconnecting EventSource
+    resumes via Last-Event-ID without gaps.
+    """
+
+    def __init__(self, poll_seconds: float = POLL_SECONDS, heartbeat_seconds: float = HEARTBEAT_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.channels = {}  # user_id -> _Channel, while the user has a stream open
+        self.lock = threading.Lock()
+        self.streams = 0
+        self.published = 0
+
+    def publish(self, user_id: str, change_type: str, data: dict | None = None):
+        if not user_id:
+            return
+        storage.add_notification(user_id, change_type, json.dumps(data or {}))
+        with self.lock:
+            channel = self.channels.get(user_id)
+            self.published += 1
+            prune = self.published % 100 == 0
+        if channel is not None:
+            with channel.condition:
+                channel.sequence += 1
+                channel.condition.notify_all()
+        if prune:
+            storage.prune_notifications(RETENTION_SECONDS)
+
+    def _open(self, user_id: str, max_streams: int | None) -> _Channel | None:
+        with self.lock:
+            if max_streams is not None and self.streams >= max_streams:
+                return None
+            channel = self.channels.setdefault(user_id, _Channel())
+            channel.listeners += 1
+            self.streams += 1
+            return channel
+
+    def _close(self, user_id: str, channel: _Channel):
+        with self.lock:
+            channel.listeners -= 1
+            self.streams -= 1
+            if channel.listeners == 0 and self.channels.get(user_id) is channel:
+                del self.channels[user_id]
+
+    def listen(self, user_id: str, last_id: int | None = None,
+               max_seconds: float | None = None, max_streams: int | None = None):
+        """
+        Generator of SSE-formatted strings for one user's stream. Runs until
+        the client disconnects, or for `max_seconds` if given. With
+        `max_streams` already open in this process, it only tells the client
+        to reconnect later.
+        """
+        channel = self._open(user_id, max_streams)
+        if channel is None:
+            yield f"retry: {BUSY_RETRY_MS}\n\n"
+            return
+        try:
+            if last_id is None:
+                last_id = storage.latest_notification_id()
+            deadline = time.monotonic() + max_seconds if max_seconds else None
+
+            yield f"retry: 5000\nid: {last_id}\n\n"
+            idle = 0.0
+            while deadline is None or time.monotonic() < deadline:
+                with channel.condition:
+                    seen = channel.sequence
+
+                rows = storage.notifications_since(user_id, last_id)
+                for row in rows:
+                    last_id = row["id"]
+                    yield f"id: {row['id']}\nevent: {row['type']}\ndata: {row['data']}\n\n"
+                if rows:
+                    idle = 0.0
+                    continue
+
+                timeout = self.poll_seconds if deadline is None else min(self.poll_seconds, max(0.0, deadline - time.monotonic()))
+                with channel.condition:
+                    woke = channel.condition.wait_for(lambda: channel.sequence != seen, timeout=timeout)
+                if not woke:
+                    idle += self.poll_seconds
+                    if idle >= self.heartbeat_seconds:
+                        idle = 0.0
+                        yield ": keep-alive\n\n"
+        finally:
+            self._close(user_id, channel)
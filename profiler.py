@@ -0,0 +1,165 @@
+import os
+import sys
+import hmac
+import time
+import heapq
+import random
+import hashlib
+import itertools
+import threading
+from collections import Counter
+
+
+# ========= CONFIG =========
+
+# Fraction of requests profiled without being asked (0 = only signed requests)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# Shared secret for the X-Profile request header (unset: header ignored)
+PROFILE_SECRET = os.getenv("PROFILE_SECRET")
+
+# Wall-clock sampling interval and how many of the slowest profiles to keep
+SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+KEEP_SLOWEST = int(os.getenv("PROFILE_KEEP", "20"))
+
+# Signed headers older than this are refused (limits replay)
+SIGNATURE_MAX_AGE_SECONDS = 300
+
+# ==========================
+
+
+def sign(path: str, timestamp: int, secret: str) -> str:
+    """
+    X-Profile header value asking for `path` to be profiled: "<unix time>:<hmac>".
+    """
+    digest = hmac.new(secret.encode(), f"{timestamp}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{timestamp}:{digest}"
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> str:
+    """Root-first "a;b;c" stack, the folded format flamegraph tools read."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profile:
+    """Stack samples of one request."""
+
+    def __init__(self, profile_id: int, route: str, method: str, thread_id: int):
+        self.id = profile_id
+        self.route = route
+        self.method = method
+        self.thread_id = thread_id
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.samples = Counter()  # folded stack -> sample count
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "route": self.route,
+            "method": self.method,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "samples": sum(self.samples.values()),
+        }
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class Profiler:
+    """
+    Opt-in wall-clock sampling profiler for requests.
+
+    A request is profiled if it wins the PROFILE_SAMPLE_RATE draw or carries a
+    valid signed X-Profile header. While any profiled request is running, one
+    background thread snapshots its stack every SAMPLE_INTERVAL_SECONDS
+    (sys._current_frames, so waits on Gemini or the Calendar API show up too);
+    when nothing is profiled the thread sleeps. Only the KEEP_SLOWEST slowest
+    finished profiles are kept.
+    """
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, secret: str = PROFILE_SECRET,
+                 interval: float = SAMPLE_INTERVAL_SECONDS, keep: int = KEEP_SLOWEST):
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.interval = interval
+        self.keep = keep
+        self.active = {}  # thread id -> Profile
+        self.slowest = []  # min-heap of (duration, id, Profile)
+        self.ids = itertools.count(1)
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def wanted(self, path: str, header: str | None) -> bool:
+        if header and self.secret:
+            timestamp, _, _ = header.partition(":")
+            if timestamp.isdigit() and abs(time.time() - int(timestamp)) <= SIGNATURE_MAX_AGE_SECONDS:
+                if hmac.compare_digest(header, sign(path, int(timestamp), self.secret)):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, route: str, method: str) -> Profile:
+        profile = Profile(next(self.ids), route, method, threading.get_ident())
+        with self.cond:
+            self.active[profile.thread_id] = profile
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="profiler", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+        return profile
+
+    def stop(self, profile: Profile):
+        profile.duration = time.perf_counter() - profile.started
+        with self.cond:
+            self.active.pop(profile.thread_id, None)
+            entry = (profile.duration, profile.id, profile)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def detach(self, profile: Profile):
+        """Pause sampling while the request waits off-thread (ASGI mode awaiting Gemini)."""
+        with self.cond:
+            self.active.pop(profile.thread_id, None)
+
+    def attach(self, profile: Profile):
+        """Resume sampling `profile` on the calling thread."""
+        with self.cond:
+            profile.thread_id = threading.get_ident()
+            self.active[profile.thread_id] = profile
+            self.cond.notify()
+
+    def profiles(self) -> list[Profile]:
+        """Kept profiles, slowest first."""
+        with self.cond:
+            return [p for _, _, p in sorted(self.slowest, reverse=True)]
+
+    def get(self, profile_id: int) -> Profile | None:
+        with self.cond:
+            return next((p for _, _, p in self.slowest if p.id == profile_id), None)
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while not self.active:
+                    self.cond.wait()
+                active = list(self.active.values())
+            frames = sys._current_frames()
+            for profile in active:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.samples[_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
@@ -0,0 +1,159 @@
+import os
+import re
+import random
+
+
+# ========= CONFIG =========
+
+# Documents up to this size (estimated prompt tokens) are quizzed in one call, whole
+QUIZ_SINGLE_PROMPT_TOKENS = int(os.getenv("QUIZ_SINGLE_PROMPT_TOKENS", "6000"))
+
+# Larger ones are cut into sections of about this size...
+QUIZ_SECTION_TOKENS = int(os.getenv("QUIZ_SECTION_TOKENS", "1500"))
+
+# ...and at most this many sections are sampled and quizzed in parallel
+QUIZ_MAX_SECTIONS = int(os.getenv("QUIZ_MAX_SECTIONS", "4"))
+
+# Rough characters per token for sizing prompts
+CHARS_PER_TOKEN = 4
+
+# ==========================
+
+# Lines that start a new section: markdown headings, "2.1 Title", ALL-CAPS titles, "Chapter 3"
+HEADING = re.compile(r"^(#{1,6}\s+\S.*|\d+(\.\d+)*\.?\s+[A-Z].*|[A-Z][A-Z0-9 ,&:'-]{3,})$")
+HEADING_WORD = re.compile(r"^(chapter|section|part|unit|lesson|module)\s+[\dIVXLC]+\b", re.IGNORECASE)
+MAX_HEADING_CHARS = 80
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _is_heading(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > MAX_HEADING_CHARS or line.endswith((".", ",", ";")):
+        return False
+    return bool(HEADING.match(line) or HEADING_WORD.match(line))
+
+
+def _pack(title: str, text: str, max_chars: int) -> list[dict]:
+    """Cut one section into parts of at most `max_chars`, at paragraph breaks where possible"""
+    if len(text) <= max_chars:
+        return [{"title": title, "text": text}]
+    parts, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        while len(paragraph) > max_chars:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        parts.append(current)
+    return [{"title": f"{title} (part {i})" if title else "", "text": part} for i, part in enumerate(parts, 1)]
+
+
+def split_sections(text: str, section_tokens: int = QUIZ_SECTION_TOKENS) -> list[dict]:
+    """
+    Document -> [{"title", "text", "tokens"}] in reading order, split at
+    headings and then cut to about `section_tokens` each. Text without
+    headings is cut by size alone.
+    """
+    raw, title, lines = [], "", []
+    for line in text.splitlines():
+        if _is_heading(line):
+            if "".join(lines).strip():
+                raw.append((title, "\n".join(lines).strip()))
+            title, lines = line.strip().lstrip("#").strip(), []
+        else:
+            lines.append(line)
+    if "".join(lines).strip():
+        raw.append((title, "\n".join(lines).strip()))
+
+    max_chars = section_tokens * CHARS_PER_TOKEN
+    sections = []
+    for title, body in raw:
+        # Tiny sections (a heading over one line) ride along with the previous one
+        if sections and len(body) < max_chars // 4 and len(sections[-1]["text"]) + len(body) <= max_chars:
+            sections[-1]["text"] += f"\n\n{title}\n{body}" if title else f"\n\n{body}"
+            continue
+        sections.extend(_pack(title, body, max_chars))
+    for section in sections:
+        section["tokens"] = estimate_tokens(section["text"])
+    return sections
+
+
+def pick_sections(sections: list[dict], count: int, rng: random.Random = None) -> list[dict]:
+    """
+    `count` sections spread over the whole document: it is cut into `count`
+    stretches of about equal length and one section is drawn from each,
+    weighted by size. Returned in reading order.
+    """
+    if len(sections) <= count:
+        return list(sections)
+    rng = rng or random.Random()
+    total = sum(s["tokens"] for s in sections) or 1
+    strata = [[] for _ in range(count)]
+    seen = 0
+    for section in sections:
+        # Assign by the section's midpoint, so each stretch gets its fair share
+        middle = seen + section["tokens"] / 2
+        strata[min(count - 1, int(middle / total * count))].append(section)
+        seen += section["tokens"]
+    picked = []
+    for stratum in strata:
+        if stratum:
+            picked.append(rng.choices(stratum, weights=[s["tokens"] + 1 for s in stratum])[0])
+    return picked
+
+
+def question_counts(total: int, parts: int) -> list[int]:
+    """Spread `total` questions over `parts` sections (5 over 3 -> [2, 2, 1])"""
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def plan_quiz(text: str, questions: int, rng: random.Random = None) -> list[tuple]:
+    """
+    [(section title, section text, number of questions)] to ask for.
+
+    Small documents are one part, the whole text. Larger ones are sampled
+    down to at most QUIZ_MAX_SECTIONS sections (never more than `questions`),
+    so prompt size and latency stay about the same whatever the length.
+    """
+    if estimate_tokens(text) <= QUIZ_SINGLE_PROMPT_TOKENS:
+        return [("", text, questions)]
+    count = max(1, min(QUIZ_MAX_SECTIONS, questions, QUIZ_SINGLE_PROMPT_TOKENS // QUIZ_SECTION_TOKENS))
+    picked = pick_sections(split_sections(text), count, rng)
+    return [(s["title"], s["text"], n) for s, n in zip(picked, question_counts(questions, len(picked)))]
+
+
+def _valid(question) -> bool:
+    if not isinstance(question, dict) or not str(question.get("question", "")).strip():
+        return False
+    options = question.get("options")
+    correct = question.get("correct")
+    return (isinstance(options, list) and len(options) >= 2
+            and isinstance(correct, int) and 0 <= correct < len(options))
+
+
+def merge_questions(question_lists: list[list], total: int) -> list[dict]:
+    """
+    One quiz from the per-section question lists: malformed and duplicate
+    questions dropped, sections interleaved, at most `total`.
+    """
+    queues = [[q for q in questions if _valid(q)] for questions in question_lists]
+    merged, seen = [], set()
+    while len(merged) < total and any(queues):
+        for queue in queues:
+            if not queue or len(merged) >= total:
+                continue
+            question = queue.pop(0)
+            key = re.sub(r"\W+", " ", question["question"]).strip().lower()
+            if key not in seen:
+                seen.add(key)
+                merged.append(question)
+    return merged
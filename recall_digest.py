@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+import storage
+import applog
+
+
+# ========= CONFIG =========
+
+# One JSON digest per user: yesterday's topics + a ready question set
+DIGEST_FOLDER = "recall_digests"
+
+# How often the background job looks for users without today's digest
+CHECK_INTERVAL_SECONDS = 15 * 60
+
+# Users seen within this many days get a digest built for them
+ACTIVE_DAYS = 2
+
+# Set RECALL_DIGEST_JOB=0 to disable the background thread (benchmarks, tests)
+JOB_ENABLED = os.getenv("RECALL_DIGEST_JOB", "1") != "0"
+
+# A build claimed by a worker that hasn't finished within this long is taken over
+CLAIM_TIMEOUT_SECONDS = 10 * 60
+
+# ==========================
+
+log = applog.get_logger("recall_digest")
+
+
+def digest_path(user_id: str) -> str:
+    # Hashed, so any user id maps to its own safe file name
+    return os.path.join(DIGEST_FOLDER, f"{hashlib.sha256(user_id.encode()).hexdigest()}.json")
+
+
+def claim_build(user_id: str, date: str) -> bool:
+    """
+    True if this process may build `user_id`'s digest for `date` now. Every
+    worker runs a scheduler, so the claim (in the shared database) keeps the
+    Gemini call from being made once per worker.
+    """
+    return storage.claim_digest_build(user_id, date, CLAIM_TIMEOUT_SECONDS)
+
+
+def release_build(user_id: str, date: str):
+    storage.release_digest_claim(user_id, date)
+
+
+def load_digest(user_id: str) -> dict | None:
+    """
+    Read the stored digest for a user, or None if there isn't one.
+    """
+    if not user_id:
+        return None
+    try:
+        with open(digest_path(user_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_digest(user_id: str, digest: dict):
+    """
+    Atomically replace the user's digest file.
+    """
+    os.makedirs(DIGEST_FOLDER, exist_ok=True)
+    path = digest_path(user_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(digest, f)
+    os.replace(tmp_path, path)
+
+
+class DigestScheduler:
+    """
+    Daily background job that keeps a Daily Recall digest ready per active user.
+
+    `build_fn(user_id, access_token)` returns a digest dict (with a "date" key)
+    or None when it could not be built; `today_fn()` returns today's date string.
+    """
+
+    def __init__(self, build_fn, today_fn, interval: int = CHECK_INTERVAL_SECONDS):
+        self.build_fn = build_fn
+        self.today_fn = today_fn
+        self.interval = interval
+        self.users = {}  # user_id -> {"access_token": str, "last_seen": float}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def touch(self, user_id: str, access_token: str):
+        """
+        Record that a user is active and remember their latest access token.
+        """
+        if not user_id or not access_token:
+            return
+        with self.lock:
+            is_new = user_id not in self.users
+            self.users[user_id] = {"access_token": access_token, "last_seen": time.time()}
+        if is_new:
+            # Build a first digest right away instead of waiting for the next tick
+            self.wakeup.set()
+
+    def due_users(self) -> list[tuple]:
+        """
+        Active users whose stored digest is not from today.
+        """
+        today = self.today_fn()
+        cutoff = time.time() - ACTIVE_DAYS * 86400
+        with self.lock:
+            active = [(uid, u["access_token"]) for uid, u in self.users.items() if u["last_seen"] >= cutoff]
+        return [
+            (uid, token) for uid, token in active
+            if (load_digest(uid) or {}).get("date") != today
+        ]
+
+    def run_once(self):
+        today = self.today_fn()
+        for user_id, access_token in self.due_users():
+            if not claim_build(user_id, today):
+                continue  # another worker (or a request) is building it
+            digest = None
+            try:
+                digest = self.build_fn(user_id, access_token)
+                if digest is not None:
+                    save_digest(user_id, digest)
+            except Exception:
+                log.error("recall_digest.build_failed", exc_info=True, user_id=user_id)
+            if digest is None:
+                release_build(user_id, today)
+
+    def start(self):
+        """
+        Start the background thread (idempotent).
+        """
+        if self.thread is not None or not JOB_ENABLED:
+            return
+        self.thread = threading.Thread(target=self._loop, name="recall-digest", daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while True:
+            self.run_once()
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
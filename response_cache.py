@@ -0,0 +1,104 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request, make_response
+
+import storage
+
+
+# ========= CONFIG =========
+
+# Which kinds of writes make each cached response stale
+DEPENDENCIES = {
+    "dashboard_stats": ("events", "uploads", "quiz", "sessions"),
+    "events": ("events",),
+    "sessions": ("sessions",),
+    "list_uploads": ("uploads",),
+}
+
+# Upper bound on snapshots kept in memory per process
+MAX_ENTRIES = 2000
+
+# ==========================
+
+
+def uncached(value):
+    """
+    Mark a view value as not cacheable (e.g. a 200 carrying a Calendar
+    error), so `respond` passes it through instead of pinning it for the TTL.
+    """
+    response = make_response(value)
+    response.cache_control.no_store = True
+    return response
+
+
+class ResponseCache:
+    """
+    Per-user snapshots of JSON responses with ETags.
+
+    Each snapshot remembers the versions of the data it was built from
+    (storage.cache_versions); write paths call `invalidate(user_id, kind)` to
+    bump a version, which every worker process sees on its next lookup.
+    A `ttl` covers data that can change outside the app (Google Calendar).
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.entries = OrderedDict()  # (user_id, name) -> snapshot dict
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def invalidate(self, user_id: str, *kinds: str):
+        if user_id:
+            storage.bump_cache_versions(user_id, kinds)
+
+    def respond(self, user_id: str, name: str, build, ttl: float | None = None):
+        """
+        Serve `name` for `user_id` from cache, or call `build()` (returns a normal
+        Flask view value) and cache the result if it is a 200 not marked
+        `uncached`. Answers
+        If-None-Match with 304 when the client's copy is still current.
+        """
+        if not user_id:
+            return build()
+
+        key = (user_id, name)
+        versions = storage.cache_versions(user_id, DEPENDENCIES[name])
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and (entry["versions"] != versions or (entry["expires"] and entry["expires"] < now)):
+                entry = None
+            if entry:
+                self.entries.move_to_end(key)
+
+        if entry is None:
+            response = make_response(build())
+            if response.status_code != 200 or response.cache_control.no_store:
+                return response
+            body = response.get_data()
+            entry = {
+                "versions": versions,
+                "etag": hashlib.sha1(body).hexdigest(),
+                "body": body,
+                "mimetype": response.mimetype,
+                "expires": now + ttl if ttl else None,
+            }
+            with self.lock:
+                self.entries[key] = entry
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+        # Weak match: compressed responses carry a weak form of the same ETag
+        if request.if_none_match.contains_weak(entry["etag"]):
+            response = make_response("", 304)
+        else:
+            response = make_response(entry["body"])
+            response.mimetype = entry["mimetype"]
+        response.set_etag(entry["etag"])
+        # Browsers revalidate every time and get a 304 while nothing changed
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
@@ -0,0 +1,273 @@
+import os
+import time
+import uuid
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import storage
+
+
+# ========= CONFIG =========
+
+# "sqlite" (default, shared by all worker processes) or "memory" (single process)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+
+# Chat histories the SQLite backend keeps in memory per process (least recently used dropped)
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "500"))
+
+# ==========================
+
+
+class SessionStore(ABC):
+    """
+    Chat session storage used by agent_app.
+
+    A session is {"id", "user_id", "title", "history"} where history is a list
+    of {"id", "role", "content"} turns in order. Backends must make
+    `append_turns` atomic and keep `list_for_user` from touching other users.
+    """
+
+    @abstractmethod
+    def create(self, user_id: str, title: str = "New Chat") -> str:
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def get_info(self, session_id: str) -> dict | None:
+        """Session without its history: {"id", "user_id", "title"}."""
+
+    @abstractmethod
+    def get_turns(self, session_id: str, limit: int, before_id: int = None, after_id: int = None) -> tuple[list[dict], bool]:
+        """
+        One page of turns, oldest first, plus whether more exist in that direction.
+        Default is the latest `limit` turns; `before_id` pages backwards and
+        `after_id` returns turns appended since that id.
+        """
+
+    @abstractmethod
+    def list_for_user(self, user_id: str) -> list[dict]:
+        """[{"id", "title"}] newest first."""
+
+    @abstractmethod
+    def count_for_user(self, user_id: str) -> int:
+        ...
+
+    @abstractmethod
+    def set_title(self, session_id: str, title: str):
+        ...
+
+    @abstractmethod
+    def append_turns(self, session_id: str, turns: list[dict]) -> list[int]:
+        """Append turns in one step and return their ids ([] if the session no longer exists)."""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local store. Only suitable for a single worker.
+    """
+
+    def __init__(self):
+        self.sessions = {}  # session_id -> session dict
+        self.by_user = {}  # user_id -> [session_id, ...] in creation order
+        self.turn_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def create(self, user_id, title="New Chat"):
+        session_id = str(uuid.uuid4())
+        with self.lock:
+            self.sessions[session_id] = {"id": session_id, "user_id": user_id, "title": title, "history": []}
+            self.by_user.setdefault(user_id, []).append(session_id)
+        return session_id
+
+    def get(self, session_id):
+        with self.lock:
+            s = self.sessions.get(session_id)
+            return dict(s, history=list(s["history"])) if s else None
+
+    def get_info(self, session_id):
+        with self.lock:
+            s = self.sessions.get(session_id)
+            return {"id": s["id"], "user_id": s["user_id"], "title": s["title"]} if s else None
+
+    def get_turns(self, session_id, limit, before_id=None, after_id=None):
+        with self.lock:
+            history = list(self.sessions[session_id]["history"])
+        if after_id is not None:
+            newer = [t for t in history if t["id"] > after_id]
+            return newer[:limit], len(newer) > limit
+        if before_id is not None:
+            history = [t for t in history if t["id"] < before_id]
+        return history[-limit:], len(history) > limit
+
+    def list_for_user(self, user_id):
+        with self.lock:
+            ids = self.by_user.get(user_id, [])
+            return [{"id": sid, "title": self.sessions[sid]["title"]} for sid in reversed(ids)]
+
+    def count_for_user(self, user_id):
+        with self.lock:
+            return len(self.by_user.get(user_id, []))
+
+    def set_title(self, session_id, title):
+        with self.lock:
+            if session_id in self.sessions:
+                self.sessions[session_id]["title"] = title
+
+    def append_turns(self, session_id, turns):
+        with self.lock:
+            if session_id not in self.sessions:
+                return []
+            history = self.sessions[session_id]["history"]
+            ids = []
+            for turn in turns:
+                turn_id = next(self.turn_ids)
+                history.append({"id": turn_id, "role": turn["role"], "content": turn["content"]})
+                ids.append(turn_id)
+            return ids
+
+    def delete(self, session_id):
+        with self.lock:
+            s = self.sessions.pop(session_id, None)
+            if s:
+                self.by_user[s["user_id"]].remove(session_id)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions and turns in the shared WAL database, so any worker can serve any
+    session. Histories are cached per process and topped up with only the
+    turns appended since (by any worker), so the cache is never stale.
+    """
+
+    def __init__(self, cache_size: int = SESSION_CACHE_SIZE):
+        self.cache = OrderedDict()  # session_id -> (last_turn_id, [turns]), least recently used first
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    def create(self, user_id, title="New Chat"):
+        session_id = str(uuid.uuid4())
+        now = time.time()
+        conn = storage.get_connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO chat_sessions (id, user_id, title, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, user_id, title, now, now)
+            )
+        return session_id
+
+    def get(self, session_id):
+        conn = storage.get_connection()
+        row = conn.execute(
+            "SELECT id, user_id, title FROM chat_sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            with self.lock:
+                self.cache.pop(session_id, None)
+            return None
+
+        with self.lock:
+            last_id, turns = self.cache.get(session_id, (0, []))
+            if session_id in self.cache:
+                self.cache.move_to_end(session_id)
+        new_rows = conn.execute(
+            "SELECT id, role, content FROM chat_turns WHERE session_id = ? AND id > ? ORDER BY id",
+            (session_id, last_id)
+        ).fetchall()
+        if new_rows:
+            turns = turns + [dict(r) for r in new_rows]
+            with self.lock:
+                self.cache[session_id] = (new_rows[-1]["id"], turns)
+                self.cache.move_to_end(session_id)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+        return {"id": row["id"], "user_id": row["user_id"], "title": row["title"], "history": list(turns)}
+
+    def get_info(self, session_id):
+        row = storage.get_connection().execute(
+            "SELECT id, user_id, title FROM chat_sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_turns(self, session_id, limit, before_id=None, after_id=None):
+        conn = storage.get_connection()
+        # Fetch one extra row to know whether another page exists
+        if after_id is not None:
+            rows = conn.execute(
+                "SELECT id, role, content FROM chat_turns WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (session_id, after_id, limit + 1)
+            ).fetchall()
+            return [dict(r) for r in rows[:limit]], len(rows) > limit
+
+        rows = conn.execute(
+            "SELECT id, role, content FROM chat_turns WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (session_id, before_id if before_id is not None else 2 ** 63 - 1, limit + 1)
+        ).fetchall()
+        return [dict(r) for r in reversed(rows[:limit])], len(rows) > limit
+
+    def list_for_user(self, user_id):
+        rows = storage.get_connection().execute(
+            "SELECT id, title FROM chat_sessions WHERE user_id = ? ORDER BY created_at DESC, rowid DESC",
+            (user_id,)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def count_for_user(self, user_id):
+        return storage.get_connection().execute(
+            "SELECT COUNT(*) FROM chat_sessions WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def set_title(self, session_id, title):
+        conn = storage.get_connection()
+        with conn:
+            conn.execute("UPDATE chat_sessions SET title = ? WHERE id = ?", (title, session_id))
+
+    def append_turns(self, session_id, turns):
+        now = time.time()
+        conn = storage.get_connection()
+        ids = []
+        with conn:
+            for turn in turns:
+                # Only while the session exists, so a delete racing with a chat turn leaves no orphan turns
+                cur = conn.execute(
+                    """
+                    INSERT INTO chat_turns (session_id, role, content, created_at)
+                    SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM chat_sessions WHERE id = ?)
+                    """,
+                    (session_id, turn["role"], turn["content"], now, session_id)
+                )
+                if cur.rowcount == 0:
+                    return []
+                ids.append(cur.lastrowid)
+            conn.execute("UPDATE chat_sessions SET updated_at = ? WHERE id = ?", (now, session_id))
+        return ids
+
+    def delete(self, session_id):
+        conn = storage.get_connection()
+        with conn:
+            conn.execute("DELETE FROM chat_turns WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+        with self.lock:
+            self.cache.pop(session_id, None)
+
+
+BACKENDS = {
+    "sqlite": SQLiteSessionStore,
+    "memory": MemorySessionStore,
+}
+
+
+def create_session_store(backend: str = None) -> SessionStore:
+    backend = backend or SESSION_BACKEND
+    if backend not in BACKENDS:
+        raise RuntimeError(f"Unknown SESSION_BACKEND '{backend}'. Use one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend]()
@@ -27,14 +27,96 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let currentSessionId = null;
 
+    // Chat history is fetched in pages, newest first
+    const HISTORY_PAGE_SIZE = 30;
+    let oldestTurnId = null;
+
     // Initial load
     fetchEvents();
     loadSessions();
     loadManualTasks();
     loadDashboard();
 
-    // Real-time Dashboard Updates (Poll every 30 seconds)
-    setInterval(loadDashboard, 30000);
+    // Real-time updates: the server pushes a typed notification whenever
+    // something changes, and we refetch only the affected parts
+    let liveUpdates = false;
+    const jobWaiters = {};  // job id -> callback, see runJob
+    if (window.EventSource) {
+        const changes = new EventSource('/stream');
+        changes.onopen = () => { liveUpdates = true; };
+        changes.onerror = () => { liveUpdates = false; };
+
+        ['event_created', 'event_updated', 'event_deleted'].forEach(type => {
+            changes.addEventListener(type, () => {
+                fetchEvents();
+                loadDashboard();
+            });
+        });
+        ['upload_indexed', 'upload_deleted'].forEach(type => {
+            changes.addEventListener(type, () => {
+                loadDashboard();
+                const uploadQuiz = document.getElementById('upload-quiz');
+                if (uploadQuiz && !uploadQuiz.classList.contains('hidden')) {
+                    loadUploadedFiles();
+                }
+            });
+        });
+        changes.addEventListener('quiz_submitted', () => loadDashboard());
+        changes.addEventListener('sessions_changed', () => loadSessions());
+        changes.addEventListener('job_finished', (e) => {
+            const job = JSON.parse(e.data);
+            if (jobWaiters[job.job_id]) jobWaiters[job.job_id]();
+        });
+    }
+
+    // Quiz generation and interview evaluation run as server-side jobs:
+    // submit, wait for the job_finished event (polling as a fallback), then
+    // fetch the result. Resolves to the same JSON the direct endpoint returns.
+    const JOB_POLL_MS = 2000;
+    const JOB_POLL_LIVE_MS = 10000;
+    async function runJob(kind, payload) {
+        const response = await fetch(`/jobs/${kind}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(payload)
+        });
+        const job = await response.json();
+        if (response.status !== 202) return job;
+
+        await new Promise(resolve => {
+            let timer = null;
+            const finish = () => {
+                clearTimeout(timer);
+                delete jobWaiters[job.job_id];
+                resolve();
+            };
+            const poll = async () => {
+                try {
+                    const status = await (await fetch(job.status_url)).json();
+                    if (status.status !== 'queued' && status.status !== 'running') return finish();
+                } catch (error) {
+                    console.error('Error polling job:', error);
+                }
+                timer = setTimeout(poll, liveUpdates ? JOB_POLL_LIVE_MS : JOB_POLL_MS);
+            };
+            jobWaiters[job.job_id] = finish;
+            timer = setTimeout(poll, JOB_POLL_MS);
+        });
+        return (await fetch(job.result_url)).json();
+    }
+
+    // Fallback polling: every 30 seconds without a live connection, otherwise
+    // only every 5 minutes to pick up calendar edits made outside the app
+    const DASHBOARD_POLL_MS = 30000;
+    const DASHBOARD_REFRESH_MS = 300000;
+    let lastDashboardPoll = Date.now();
+    setInterval(() => {
+        const interval = liveUpdates ? DASHBOARD_REFRESH_MS : DASHBOARD_POLL_MS;
+        if (Date.now() - lastDashboardPoll >= interval) {
+            lastDashboardPoll = Date.now();
+            loadDashboard();
+        }
+    }, DASHBOARD_POLL_MS);
 
     // Event Listeners
     if (newChatBtn) {
@@ -159,7 +241,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     addMessage(data.response, 'agent');
                 }
 
-                if (data.events_updated) {
+                // With a live connection the server pushes these changes itself
+                if (data.events_updated && !liveUpdates) {
                     fetchEvents();
                     loadDashboard();
                 }
@@ -228,7 +311,7 @@ document.addEventListener('DOMContentLoaded', () => {
         fileInput.value = '';
     }
 
-    function addMessage(content, sender) {
+    function addMessage(content, sender, beforeNode = null) {
         if (!chatMessages) return;
 
         const messageDiv = document.createElement('div');
@@ -252,10 +335,52 @@ document.addEventListener('DOMContentLoaded', () => {
 
         messageDiv.appendChild(avatar);
         messageDiv.appendChild(contentDiv);
+
+        // Older history pages are inserted above what is already shown
+        if (beforeNode) {
+            chatMessages.insertBefore(messageDiv, beforeNode);
+            return;
+        }
         chatMessages.appendChild(messageDiv);
         chatMessages.scrollTop = chatMessages.scrollHeight;
     }
 
+    function renderLoadOlderButton(hasMore) {
+        const existing = document.getElementById('load-older-btn');
+        if (existing) existing.remove();
+        if (!hasMore || !chatMessages) return;
+
+        const button = document.createElement('button');
+        button.id = 'load-older-btn';
+        button.classList.add('load-older-btn');
+        button.textContent = 'Load older messages';
+        button.onclick = loadOlderTurns;
+        chatMessages.insertBefore(button, chatMessages.firstChild);
+    }
+
+    async function loadOlderTurns() {
+        if (!currentSessionId || oldestTurnId === null) return;
+
+        try {
+            const response = await fetch(`/history/${currentSessionId}?limit=${HISTORY_PAGE_SIZE}&before=${oldestTurnId}`);
+            const page = await response.json();
+
+            // Keep the user's place while older messages are added above
+            const previousHeight = chatMessages.scrollHeight;
+            const firstMessage = document.getElementById('load-older-btn').nextSibling;
+            page.turns.forEach(msg => {
+                const sender = msg.role === 'model' ? 'agent' : 'user';
+                addMessage(msg.content, sender, firstMessage);
+            });
+            chatMessages.scrollTop += chatMessages.scrollHeight - previousHeight;
+
+            oldestTurnId = page.oldest_id;
+            renderLoadOlderButton(page.has_more);
+        } catch (error) {
+            console.error('Error loading older messages:', error);
+        }
+    }
+
     async function fetchEvents() {
         if (!eventsList) return;
 
@@ -474,17 +599,19 @@ document.addEventListener('DOMContentLoaded', () => {
         if (sessionId === currentSessionId) return;
 
         try {
-            const response = await fetch(`/history/${sessionId}`);
-            const history = await response.json();
+            const response = await fetch(`/history/${sessionId}?limit=${HISTORY_PAGE_SIZE}`);
+            const page = await response.json();
 
             currentSessionId = sessionId;
+            oldestTurnId = page.oldest_id;
             if (chatMessages) {
                 chatMessages.innerHTML = '';
 
-                history.forEach(msg => {
+                page.turns.forEach(msg => {
                     const sender = msg.role === 'model' ? 'agent' : 'user';
                     addMessage(msg.content, sender);
                 });
+                renderLoadOlderButton(page.has_more);
             }
 
             loadSessions();
@@ -648,17 +775,19 @@ document.addEventListener('DOMContentLoaded', () => {
         if (sessionId === currentSessionId) return;
 
         try {
-            const response = await fetch(`/history/${sessionId}`);
-            const history = await response.json();
+            const response = await fetch(`/history/${sessionId}?limit=${HISTORY_PAGE_SIZE}`);
+            const page = await response.json();
 
             currentSessionId = sessionId;
+            oldestTurnId = page.oldest_id;
             if (chatMessages) {
                 chatMessages.innerHTML = '';
 
-                history.forEach(msg => {
+                page.turns.forEach(msg => {
                     const sender = msg.role === 'model' ? 'agent' : 'user';
                     addMessage(msg.content, sender);
                 });
+                renderLoadOlderButton(page.has_more);
             }
 
             loadSessions();
@@ -889,12 +1018,7 @@ document.addEventListener('DOMContentLoaded', () => {
         questionsContainer.classList.remove('hidden');
 
         try {
-            const response = await fetch('/generate_quiz', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ mode: 'upload', filename })
-            });
-            const data = await response.json();
+            const data = await runJob('generate_quiz', { mode: 'upload', filename });
 
             if (data.questions) {
                 displayQuestions(data.questions, questionsContainer, filename);
@@ -950,12 +1074,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 interviewChat.classList.remove('hidden');
 
                 try {
-                    const response = await fetch('/generate_quiz', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ mode: 'interview', job_role: jobRole })
-                    });
-                    const data = await response.json();
+                    const data = await runJob('generate_quiz', { mode: 'interview', job_role: jobRole });
 
                     if (data.questions) {
                         interviewChat.innerHTML = '';
@@ -982,6 +1101,22 @@ document.addEventListener('DOMContentLoaded', () => {
                             answerArea.id = `answer-${idx}`;
                             answerArea.classList.add('interview-answer-area');
                             answerArea.placeholder = 'Type your answer here...';
+                            // Each answer is scored in the background once written,
+                            // so submitting only has to merge the scores
+                            answerArea.addEventListener('change', () => {
+                                if (!data.interview_id) return;
+                                fetch('/interview_answer', {
+                                    method: 'POST',
+                                    headers: { 'Content-Type': 'application/json' },
+                                    body: JSON.stringify({
+                                        interview_id: data.interview_id,
+                                        question_index: idx,
+                                        question: q.question,
+                                        answer: answerArea.value,
+                                        job_role: jobRole
+                                    })
+                                }).catch(error => console.error('Error sending answer:', error));
+                            });
                             qaCard.appendChild(answerArea);
 
                             interviewChat.appendChild(qaCard);
@@ -1003,12 +1138,11 @@ document.addEventListener('DOMContentLoaded', () => {
                             }));
 
                             try {
-                                const evalResponse = await fetch('/evaluate_interview', {
-                                    method: 'POST',
-                                    headers: { 'Content-Type': 'application/json' },
-                                    body: JSON.stringify({ qa_pairs: answers, job_role: jobRole })
+                                const evalData = await runJob('evaluate_interview', {
+                                    qa_pairs: answers,
+                                    job_role: jobRole,
+                                    interview_id: data.interview_id
                                 });
-                                const evalData = await evalResponse.json();
 
                                 const resultDiv = document.createElement('div');
                                 resultDiv.classList.add('quiz-score');
@@ -1022,7 +1156,7 @@ document.addEventListener('DOMContentLoaded', () => {
                                     evalData.evaluations.forEach(ev => {
                                         feedbackHtml += `
                                             <div class="interview-feedback-item">
-                                                <span class="feedback-rating">Q${ev.question_index + 1} Rating: ${ev.rating}/10</span>
+                                                <span class="feedback-rating">Q${ev.question_index + 1} Rating: ${ev.rating ?? '-'}/10</span>
                                                 <p style="font-size: 0.95rem; color: var(--text-secondary);">${ev.feedback}</p>
                                             </div>
                                         `;
@@ -0,0 +1,697 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+import applog
+
+
+# ========= CONFIG =========
+
+# Single SQLite database shared by all worker processes (WAL mode)
+DB_FILE = os.getenv("STUDYCOPILOT_DB", "studycopilot.db")
+
+# Legacy quiz history file, migrated into the database on first start
+LEGACY_QUIZ_HISTORY_FILE = "quiz_history.json"
+
+# Number of recent scores kept per topic for the knowledge-profile trend
+TREND_LENGTH = 5
+
+# ==========================
+
+log = applog.get_logger("storage")
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS quiz_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    date TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    score REAL NOT NULL,
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_results_user ON quiz_results (user_id, id);
+CREATE TABLE IF NOT EXISTS topic_stats (
+    user_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    total_pct REAL NOT NULL,
+    recent TEXT NOT NULL,
+    PRIMARY KEY (user_id, topic)
+);
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user ON chat_sessions (user_id, created_at);
+CREATE TABLE IF NOT EXISTS chat_turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_turns_session ON chat_turns (session_id, id);
+CREATE TABLE IF NOT EXISTS manual_tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    text TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_manual_tasks_user ON manual_tasks (user_id, id);
+CREATE TABLE IF NOT EXISTS cache_versions (
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (user_id, kind)
+);
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications (user_id, id);
+CREATE TABLE IF NOT EXISTS uploads (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    pages INTEGER,
+    status TEXT NOT NULL,
+    uploaded_at REAL NOT NULL,
+    PRIMARY KEY (user_id, name)
+);
+CREATE TABLE IF NOT EXISTS llm_usage_daily (
+    day TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    route TEXT NOT NULL,
+    prompt_type TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    cache_hits INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    latency_ms_total REAL NOT NULL DEFAULT 0,
+    latency_ms_max REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_id, route, prompt_type)
+);
+CREATE INDEX IF NOT EXISTS idx_llm_usage_user ON llm_usage_daily (user_id, day);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    status_code INTEGER,
+    result TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs (expires_at);
+CREATE TABLE IF NOT EXISTS interview_answers (
+    user_id TEXT NOT NULL,
+    interview_id TEXT NOT NULL,
+    question_index INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rating INTEGER,
+    feedback TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, interview_id, question_index)
+);
+CREATE TABLE IF NOT EXISTS digest_claims (
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    PRIMARY KEY (user_id, date)
+);
+"""
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    One connection per thread (sqlite3 connections aren't shareable across threads).
+    The schema is created and legacy data migrated the first time a path is opened.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_FILE:
+        return conn
+
+    conn = sqlite3.connect(DB_FILE, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _local.conn = conn
+    _local.path = DB_FILE
+
+    with _schema_lock:
+        if DB_FILE not in _schema_ready:
+            with conn:
+                conn.executescript(SCHEMA)
+            migrate_legacy_quiz_history(conn)
+            if not conn.execute("SELECT 1 FROM meta WHERE key = 'topic_stats_built'").fetchone():
+                rebuild_topic_stats(conn)
+            _schema_ready.add(DB_FILE)
+    return conn
+
+
+# ========================
+# Quiz history
+# ========================
+
+def migrate_legacy_quiz_history(conn: sqlite3.Connection):
+    """
+    Import quiz_history.json once, then rename it so it is never read again.
+    Safe when several worker processes start at the same time: the import
+    happens in one write transaction that re-checks the migration marker.
+    """
+    if not os.path.exists(LEGACY_QUIZ_HISTORY_FILE):
+        return
+    done = conn.execute("SELECT value FROM meta WHERE key = 'quiz_history_migrated'").fetchone()
+    if done:
+        return
+
+    try:
+        with open(LEGACY_QUIZ_HISTORY_FILE, "r") as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        return  # another worker migrated and renamed it meanwhile
+    except (OSError, ValueError) as e:
+        log.error("storage.migration_unreadable", path=LEGACY_QUIZ_HISTORY_FILE, error=e)
+        return
+
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        # Re-check under the write lock: another worker may have imported it first
+        imported = conn.execute("SELECT 1 FROM meta WHERE key = 'quiz_history_migrated'").fetchone() is None
+        if imported:
+            conn.executemany(
+                "INSERT INTO quiz_results (user_id, date, topic, score, total) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (e.get("user_id"), e.get("date", ""), e.get("topic", "General"), e.get("score", 0), e.get("total", 1))
+                    for e in history
+                ]
+            )
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('quiz_history_migrated', ?)", (str(len(history)),))
+            # Imported rows bypassed the aggregates, so rebuild them
+            conn.execute("DELETE FROM meta WHERE key = 'topic_stats_built'")
+    try:
+        os.replace(LEGACY_QUIZ_HISTORY_FILE, LEGACY_QUIZ_HISTORY_FILE + ".migrated")
+    except FileNotFoundError:
+        pass  # already renamed by another worker
+    if imported:
+        log.info("storage.migrated_quiz_history", results=len(history), path=LEGACY_QUIZ_HISTORY_FILE)
+
+
+def append_quiz_result(user_id: str, date: str, topic: str, score: float, total: float) -> int:
+    """
+    Atomically append one quiz result and fold it into the topic aggregates.
+    Returns its row id.
+    """
+    conn = get_connection()
+    with conn:
+        # Take the write lock up front: the trend update reads before it writes
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(
+            "INSERT INTO quiz_results (user_id, date, topic, score, total) VALUES (?, ?, ?, ?, ?)",
+            (user_id, date, topic, score, total)
+        )
+        _add_to_topic_stats(conn, user_id, topic, score / total * 100)
+    return cur.lastrowid
+
+
+def _add_to_topic_stats(conn: sqlite3.Connection, user_id: str, topic: str, percentage: float):
+    """
+    O(1) update of one (user, topic) aggregate: attempts, running sum, last-N trend.
+    """
+    key = (user_id or "", topic)
+    row = conn.execute("SELECT recent FROM topic_stats WHERE user_id = ? AND topic = ?", key).fetchone()
+    recent = (json.loads(row["recent"]) if row else []) + [round(percentage, 1)]
+    conn.execute(
+        """INSERT INTO topic_stats (user_id, topic, attempts, total_pct, recent) VALUES (?, ?, 1, ?, ?)
+           ON CONFLICT (user_id, topic) DO UPDATE SET
+               attempts = attempts + 1,
+               total_pct = total_pct + excluded.total_pct,
+               recent = excluded.recent""",
+        (*key, percentage, json.dumps(recent[-TREND_LENGTH:]))
+    )
+
+
+def rebuild_topic_stats(conn: sqlite3.Connection):
+    """
+    Recompute every aggregate from quiz_results (first start or after a migration).
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM topic_stats")
+        rows = conn.execute("SELECT user_id, topic, score, total FROM quiz_results ORDER BY id").fetchall()
+        for row in rows:
+            _add_to_topic_stats(conn, row["user_id"], row["topic"], row["score"] / (row["total"] or 1) * 100)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('topic_stats_built', ?)", (str(len(rows)),))
+
+
+def knowledge_profile(user_id: str) -> list[dict]:
+    """
+    Ready-made Knowledge Profile: average score per topic, best first.
+    Cost depends on the number of topics, not on the length of the history.
+    """
+    rows = get_connection().execute(
+        "SELECT topic, attempts, total_pct, recent FROM topic_stats WHERE user_id = ? ORDER BY total_pct / attempts DESC",
+        (user_id or "",)
+    ).fetchall()
+    return [
+        {
+            "topic": row["topic"],
+            "level": round(row["total_pct"] / row["attempts"]),
+            "attempts": row["attempts"],
+            "trend": json.loads(row["recent"])
+        }
+        for row in rows
+    ]
+
+
+def quiz_results_for_user(user_id: str) -> list[dict]:
+    """
+    All quiz results of one user, oldest first (served from the user_id index).
+    """
+    rows = get_connection().execute(
+        "SELECT id, user_id, date, topic, score, total FROM quiz_results WHERE user_id IS ? ORDER BY id",
+        (user_id,)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+# ========================
+# Manual tasks
+# ========================
+
+def _task_dict(row) -> dict:
+    return {"id": row["id"], "user_id": row["user_id"], "text": row["text"], "completed": bool(row["completed"])}
+
+
+def tasks_for_user(user_id: str) -> list[dict]:
+    rows = get_connection().execute(
+        "SELECT id, user_id, text, completed FROM manual_tasks WHERE user_id IS ? ORDER BY id",
+        (user_id,)
+    ).fetchall()
+    return [_task_dict(row) for row in rows]
+
+
+def create_task(user_id: str, text: str) -> dict:
+    """
+    Insert a task. Ids come from AUTOINCREMENT, so they are unique across
+    threads and worker processes.
+    """
+    conn = get_connection()
+    with conn:
+        cur = conn.execute("INSERT INTO manual_tasks (user_id, text) VALUES (?, ?)", (user_id, text))
+    return {"id": cur.lastrowid, "user_id": user_id, "text": text, "completed": False}
+
+
+def toggle_task(user_id: str, task_id: int) -> dict | None:
+    """
+    Flip a task's completed flag. None if the task doesn't exist or isn't the user's.
+    """
+    conn = get_connection()
+    with conn:
+        cur = conn.execute(
+            "UPDATE manual_tasks SET completed = NOT completed WHERE id = ? AND user_id IS ?",
+            (task_id, user_id)
+        )
+        if cur.rowcount == 0:
+            return None
+        row = conn.execute("SELECT id, user_id, text, completed FROM manual_tasks WHERE id = ?", (task_id,)).fetchone()
+    return _task_dict(row)
+
+
+def delete_task(user_id: str, task_id: int) -> bool:
+    conn = get_connection()
+    with conn:
+        cur = conn.execute("DELETE FROM manual_tasks WHERE id = ? AND user_id IS ?", (task_id, user_id))
+    return cur.rowcount > 0
+
+
+# ========================
+# Response cache versions
+# ========================
+
+def bump_cache_versions(user_id: str, kinds):
+    """
+    Mark one user's cached responses built from `kinds` of data as stale.
+    """
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            """INSERT INTO cache_versions (user_id, kind, version) VALUES (?, ?, 1)
+               ON CONFLICT (user_id, kind) DO UPDATE SET version = version + 1""",
+            [(user_id, kind) for kind in kinds]
+        )
+
+
+def cache_versions(user_id: str, kinds) -> tuple:
+    """
+    Current version of each kind, in the order given (0 if never written).
+    """
+    rows = get_connection().execute(
+        "SELECT kind, version FROM cache_versions WHERE user_id = ?", (user_id,)
+    ).fetchall()
+    versions = {row["kind"]: row["version"] for row in rows}
+    return tuple(versions.get(kind, 0) for kind in kinds)
+
+
+# ========================
+# Change notifications
+# ========================
+
+def add_notification(user_id: str, change_type: str, data: str) -> int:
+    conn = get_connection()
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO notifications (user_id, type, data, created_at) VALUES (?, ?, ?, ?)",
+            (user_id, change_type, data, time.time())
+        )
+    return cur.lastrowid
+
+
+def notifications_since(user_id: str, after_id: int, limit: int = 100) -> list[dict]:
+    rows = get_connection().execute(
+        "SELECT id, type, data FROM notifications WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+        (user_id, after_id, limit)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def latest_notification_id() -> int:
+    return get_connection().execute("SELECT COALESCE(MAX(id), 0) FROM notifications").fetchone()[0]
+
+
+def prune_notifications(max_age_seconds: float):
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM notifications WHERE created_at < ?", (time.time() - max_age_seconds,))
+
+
+# ========================
+# Upload manifest
+# ========================
+
+UPLOAD_COLUMNS = ("name", "size", "sha256", "pages", "status", "uploaded_at")
+
+
+def _manifest_key(user_id: str) -> str:
+    return f"uploads_manifest:{user_id}"
+
+
+def has_upload_manifest(user_id: str) -> bool:
+    return get_connection().execute(
+        "SELECT 1 FROM meta WHERE key = ?", (_manifest_key(user_id),)
+    ).fetchone() is not None
+
+
+def upsert_upload(user_id: str, entry: dict):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO uploads (user_id, name, size, sha256, pages, status, uploaded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, *(entry[c] for c in UPLOAD_COLUMNS))
+        )
+
+
+def complete_upload(user_id: str, name: str, sha256: str, pages: int | None, status: str):
+    """Fill in a rebuilt entry, unless it was replaced by a fresh upload meanwhile"""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE uploads SET sha256 = ?, pages = ?, status = ? "
+            "WHERE user_id = ? AND name = ? AND (sha256 = '' OR status = 'pending')",
+            (sha256, pages, status, user_id, name)
+        )
+
+
+def delete_upload(user_id: str, name: str):
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM uploads WHERE user_id = ? AND name = ?", (user_id, name))
+
+
+def replace_uploads(user_id: str, entries: list[dict]):
+    """
+    Swap in a freshly walked manifest for one user and mark it as built.
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM uploads WHERE user_id = ?", (user_id,))
+        conn.executemany(
+            "INSERT INTO uploads (user_id, name, size, sha256, pages, status, uploaded_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(user_id, *(e[c] for c in UPLOAD_COLUMNS)) for e in entries]
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (_manifest_key(user_id), str(len(entries))))
+
+
+def uploads_for_user(user_id: str) -> list[dict]:
+    rows = get_connection().execute(
+        "SELECT name, size, sha256, pages, status, uploaded_at FROM uploads WHERE user_id = ? ORDER BY uploaded_at",
+        (user_id,)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def upload_count(user_id: str) -> int:
+    return get_connection().execute("SELECT COUNT(*) FROM uploads WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+# ========================
+# LLM usage (daily aggregates)
+# ========================
+
+LLM_USAGE_GROUPS = ("user_id", "route", "prompt_type", "day")
+
+
+def add_llm_usage(day: str, user_id: str, route: str, prompt_type: str, *, calls: int = 1, errors: int = 0,
+                  cache_hits: int = 0, prompt_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0,
+                  latency_ms: float = 0.0):
+    """
+    Fold one LLM call (or cache hit) into its (day, user, route, prompt type) row.
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO llm_usage_daily (day, user_id, route, prompt_type, calls, errors, cache_hits,
+                                         prompt_tokens, output_tokens, cached_tokens, latency_ms_total, latency_ms_max)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, user_id, route, prompt_type) DO UPDATE SET
+                calls = calls + excluded.calls,
+                errors = errors + excluded.errors,
+                cache_hits = cache_hits + excluded.cache_hits,
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                cached_tokens = cached_tokens + excluded.cached_tokens,
+                latency_ms_total = latency_ms_total + excluded.latency_ms_total,
+                latency_ms_max = MAX(latency_ms_max, excluded.latency_ms_max)
+            """,
+            (day, user_id, route, prompt_type, calls, errors, cache_hits,
+             prompt_tokens, output_tokens, cached_tokens, latency_ms, latency_ms)
+        )
+
+
+def llm_tokens_for_day(user_id: str, day: str) -> int:
+    return get_connection().execute(
+        "SELECT COALESCE(SUM(prompt_tokens + output_tokens), 0) FROM llm_usage_daily WHERE user_id = ? AND day = ?",
+        (user_id, day)
+    ).fetchone()[0]
+
+
+def llm_usage_summary(since_day: str, group_by: str = "prompt_type", user_id: str = None) -> list[dict]:
+    """
+    Totals per `group_by` value from `since_day` on, most tokens first.
+    """
+    if group_by not in LLM_USAGE_GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(LLM_USAGE_GROUPS)}")
+    where, params = "day >= ?", [since_day]
+    if user_id:
+        where += " AND user_id = ?"
+        params.append(user_id)
+    rows = get_connection().execute(
+        f"""
+        SELECT {group_by} AS "key", SUM(calls) AS calls, SUM(errors) AS errors, SUM(cache_hits) AS cache_hits,
+               SUM(prompt_tokens) AS prompt_tokens, SUM(output_tokens) AS output_tokens,
+               SUM(cached_tokens) AS cached_tokens, SUM(latency_ms_total) AS latency_ms_total,
+               MAX(latency_ms_max) AS latency_ms_max
+        FROM llm_usage_daily WHERE {where}
+        GROUP BY {group_by}
+        ORDER BY SUM(prompt_tokens + output_tokens) DESC
+        """,
+        params
+    ).fetchall()
+    return [
+        dict(row, avg_latency_ms=round(row["latency_ms_total"] / row["calls"], 1) if row["calls"] else None)
+        for row in rows
+    ]
+
+
+# ========================
+# Background jobs
+# ========================
+
+def create_job(job_id: str, user_id: str, kind: str, expires_at: float):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO jobs (id, user_id, kind, status, created_at, expires_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, user_id, kind, time.time(), expires_at)
+        )
+
+
+def start_job(job_id: str):
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (job_id,))
+
+
+def finish_job(job_id: str, status: str, status_code: int, result, expires_at: float):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, status_code = ?, result = ?, finished_at = ?, expires_at = ? WHERE id = ?",
+            (status, status_code, json.dumps(result), time.time(), expires_at, job_id)
+        )
+
+
+def get_job(user_id: str, job_id: str) -> dict | None:
+    """One of the user's jobs, unless it has expired"""
+    row = get_connection().execute(
+        "SELECT * FROM jobs WHERE id = ? AND user_id = ? AND expires_at >= ?",
+        (job_id, user_id, time.time())
+    ).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+def prune_jobs():
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),))
+
+
+# ========================
+# Mock interview answers (scored one by one)
+# ========================
+
+def save_interview_answer(user_id: str, interview_id: str, question_index: int, question: str, answer: str) -> bool:
+    """
+    Store an answer as pending. False if this exact answer is already scored
+    or being scored, so it needn't be sent to the model again.
+    """
+    conn = get_connection()
+    with conn:
+        row = conn.execute(
+            "SELECT answer, status FROM interview_answers WHERE user_id = ? AND interview_id = ? AND question_index = ?",
+            (user_id, interview_id, question_index)
+        ).fetchone()
+        if row is not None and row["answer"] == answer and row["status"] != "failed":
+            return False
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO interview_answers
+                (user_id, interview_id, question_index, question, answer, status, rating, feedback, updated_at)
+            VALUES (?, ?, ?, ?, ?, 'pending', NULL, NULL, ?)
+            """,
+            (user_id, interview_id, question_index, question, answer, time.time())
+        )
+    return True
+
+
+def finish_interview_answer(user_id: str, interview_id: str, question_index: int, answer: str,
+                            status: str, rating: int = None, feedback: str = None):
+    """Record a score, unless the answer was edited (and re-queued) meanwhile"""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            """
+            UPDATE interview_answers SET status = ?, rating = ?, feedback = ?, updated_at = ?
+            WHERE user_id = ? AND interview_id = ? AND question_index = ? AND answer = ?
+            """,
+            (status, rating, feedback, time.time(), user_id, interview_id, question_index, answer)
+        )
+
+
+def move_interview_answer(user_id: str, interview_id: str, question_index: int, answer: str,
+                          from_status: str, to_status: str) -> bool:
+    """Change an answer's status only if it is still `from_status` (and unedited); True if it was"""
+    conn = get_connection()
+    with conn:
+        cur = conn.execute(
+            """
+            UPDATE interview_answers SET status = ?, updated_at = ?
+            WHERE user_id = ? AND interview_id = ? AND question_index = ? AND answer = ? AND status = ?
+            """,
+            (to_status, time.time(), user_id, interview_id, question_index, answer, from_status)
+        )
+    return cur.rowcount == 1
+
+
+def interview_answers(user_id: str, interview_id: str) -> dict[int, dict]:
+    rows = get_connection().execute(
+        "SELECT * FROM interview_answers WHERE user_id = ? AND interview_id = ?",
+        (user_id, interview_id)
+    ).fetchall()
+    return {row["question_index"]: dict(row) for row in rows}
+
+
+def prune_interview_answers(max_age_seconds: float):
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM interview_answers WHERE updated_at < ?", (time.time() - max_age_seconds,))
+
+
+# ========================
+# Recall digest builds (one process per user and day)
+# ========================
+
+def claim_digest_build(user_id: str, date: str, stale_after_seconds: float) -> bool:
+    """
+    Claim building `user_id`'s digest for `date`. False if another worker holds
+    a claim younger than `stale_after_seconds` (older ones are taken over).
+    """
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM digest_claims WHERE date < ?", (date,))
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO digest_claims (user_id, date, claimed_at) VALUES (?, ?, ?)",
+            (user_id, date, now)
+        )
+        if cur.rowcount == 0:
+            cur = conn.execute(
+                "UPDATE digest_claims SET claimed_at = ? WHERE user_id = ? AND date = ? AND claimed_at < ?",
+                (now, user_id, date, now - stale_after_seconds)
+            )
+    return cur.rowcount == 1
+
+
+def release_digest_claim(user_id: str, date: str):
+    """Give up a claim (the build failed), so the next attempt can start right away"""
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM digest_claims WHERE user_id = ? AND date = ?", (user_id, date))
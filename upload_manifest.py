@@ -0,0 +1,112 @@
+import os
+import time
+import hashlib
+
+import storage
+
+
+# Index status values stored per file
+INDEXED = "indexed"
+FAILED = "failed"
+PENDING = "pending"
+
+
+def file_sha256(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pdf_page_count(filepath: str) -> int | None:
+    import pypdf  # deferred: heavy import, only needed for PDFs
+    try:
+        return len(pypdf.PdfReader(filepath).pages)
+    except Exception:
+        return None
+
+
+def record_upload(user_id: str, filepath: str, status: str, pages: int | None = None,
+                  sha256: str | None = None, size: int | None = None) -> dict:
+    """
+    Add or replace one file's manifest entry. Called by the upload path.
+    """
+    entry = {
+        "name": os.path.basename(filepath),
+        "size": size if size is not None else os.path.getsize(filepath),
+        "sha256": sha256 or file_sha256(filepath),
+        "pages": pages,
+        "status": status,
+        "uploaded_at": time.time(),
+    }
+    storage.upsert_upload(user_id, entry)
+    return entry
+
+
+def remove_upload(user_id: str, filename: str):
+    storage.delete_upload(user_id, filename)
+
+
+def rebuild(user_id: str, user_folder: str, allowed, indexed_names) -> int:
+    """
+    Recreate a user's manifest from a scandir walk of their upload folder.
+    `allowed(filename)` filters file types; `indexed_names` is the set of
+    filenames already in the RAG index.
+
+    Only the directory listing is used, so this is quick even while the
+    startup indexing is still running: files not indexed yet are PENDING and
+    hashes ("") and page counts are left for `fill_in`.
+    """
+    entries = []
+    if os.path.isdir(user_folder):
+        with os.scandir(user_folder) as it:
+            for item in it:
+                if not item.is_file() or not allowed(item.name):
+                    continue
+                stat = item.stat()
+                entries.append({
+                    "name": item.name,
+                    "size": stat.st_size,
+                    "sha256": "",
+                    "pages": None,
+                    "status": INDEXED if item.name in indexed_names else PENDING,
+                    "uploaded_at": stat.st_mtime,
+                })
+    storage.replace_uploads(user_id, entries)
+    return len(entries)
+
+
+def fill_in(user_id: str, user_folder: str, indexed_names) -> int:
+    """
+    Complete the entries `rebuild` left unfinished, once startup indexing is
+    done: hash, page count, and INDEXED or (text extraction failed) FAILED.
+    Returns how many entries were completed.
+    """
+    completed = 0
+    for entry in storage.uploads_for_user(user_id):
+        if entry["sha256"] and entry["status"] != PENDING:
+            continue
+        filepath = os.path.join(user_folder, entry["name"])
+        try:
+            sha256 = file_sha256(filepath)
+        except OSError:
+            continue  # deleted meanwhile
+        storage.complete_upload(
+            user_id, entry["name"], sha256,
+            pdf_page_count(filepath) if entry["name"].lower().endswith(".pdf") else None,
+            INDEXED if entry["name"] in indexed_names else FAILED
+        )
+        completed += 1
+    return completed
+
+
+def ensure(user_id: str, user_folder: str, allowed, indexed_names) -> bool:
+    """
+    Build the manifest the first time a user's uploads are looked at.
+    True if it was (re)built, and so still needs `fill_in`.
+    """
+    if storage.has_upload_manifest(user_id):
+        return False
+    rebuild(user_id, user_folder, allowed, indexed_names)
+    return True
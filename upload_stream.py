@@ -0,0 +1,73 @@
+import os
+import hashlib
+import tempfile
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+# ========= CONFIG =========
+
+# Largest accepted upload (file body) and PDF page count
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024
+MAX_UPLOAD_PAGES = int(os.getenv("MAX_UPLOAD_PAGES", "500"))
+
+# Extra bytes allowed on top of MAX_UPLOAD_BYTES for multipart headers and boundaries
+MULTIPART_OVERHEAD = 64 * 1024
+
+# ==========================
+
+
+class IncomingFile:
+    """
+    Destination for one multipart file part while the request body is parsed.
+
+    Werkzeug's parser writes each chunk straight into a temp file next to the
+    final location (so saving is a rename, not a copy), the SHA-256 and size
+    are computed in the same pass, and the upload is aborted with a 413 as
+    soon as it grows past `max_bytes`. Text uploads can also keep their bytes
+    so indexing doesn't have to read the file back.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = MAX_UPLOAD_BYTES, keep_bytes: bool = False):
+        os.makedirs(folder, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=folder, prefix=".incoming-", suffix=".part", delete=False)
+        self.path = self.file.name
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.chunks = [] if keep_bytes else None
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge(f"File is larger than {self.max_bytes // (1024 * 1024)} MB.")
+        self.digest.update(data)
+        if self.chunks is not None:
+            self.chunks.append(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        # seek/read/tell/... for werkzeug's FileStorage
+        return getattr(self.file, name)
+
+    @property
+    def sha256(self) -> str:
+        return self.digest.hexdigest()
+
+    def data(self) -> bytes | None:
+        """The full body if it was kept in memory (text uploads)."""
+        return b"".join(self.chunks) if self.chunks is not None else None
+
+    def commit(self, filepath: str):
+        """Move the finished upload into place (atomic, same filesystem)."""
+        self.file.close()
+        os.replace(self.path, filepath)
+        self.path = None
+
+    def discard(self):
+        """Drop a rejected or unused upload."""
+        self.file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None